@@ -1,14 +1,89 @@
 import base64
+import functools
 import hashlib
 import json
+import math
 import os
+import random
+import re
 import time
 import requests
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from urllib.parse import urlparse
 
 import click
 
+from requests.adapters import HTTPAdapter
+
+from infra_visualiser_action.files import map_file
+
+# Matches the "Actions.Results:<runBackendId>:<jobBackendId>" entry of the
+# space-separated scp claim inside a decoded JWT payload
+_RESULTS_SCOPE_RE = re.compile(
+    rb'(?<![^\s"])Actions\.Results:([^:\s"]+):([^:\s"]+)(?![^\s"])'
+)
+
+
+@functools.lru_cache(maxsize=4)
+def _decode_backend_ids(runtime_token: str) -> dict:
+    """
+    Decode the ACTIONS_RUNTIME_TOKEN JWT (without verification) to extract
+    workflowRunBackendId and workflowJobRunBackendId from the 'scp' claim.
+
+    The scp claim looks like:
+      "Actions.ExampleScope Actions.Results:<runBackendId>:<jobBackendId>"
+
+    The token is process-wide, so the result is memoized per token string.
+    """
+    try:
+        parts = runtime_token.split(".", 2)
+        if len(parts) < 2:
+            raise ValueError("Token does not have a payload segment")
+
+        # Restore the base64 padding JWTs strip
+        payload_b64 = parts[1].encode("ascii")
+        payload = base64.urlsafe_b64decode(payload_b64 + b"=" * (-len(payload_b64) % 4))
+
+        # The IDs are the only thing needed from the claims, so pick the
+        # scope straight out of the raw payload instead of parsing its JSON
+        match = _RESULTS_SCOPE_RE.search(payload)
+        if not match:
+            raise ValueError("No Actions.Results scope found in token claims")
+
+        return {
+            "workflowRunBackendId": match.group(1).decode("ascii"),
+            "workflowJobRunBackendId": match.group(2).decode("ascii"),
+        }
+    except Exception as e:
+        raise click.ClickException(
+            f"Failed to extract backend IDs from ACTIONS_RUNTIME_TOKEN: {e}"
+        )
+
+
+# Longest Retry-After delay honoured, so a misbehaving server cannot stall the run
+MAX_RETRY_AFTER_S = 30.0
+
+
+def _retry_after_seconds(resp: requests.Response) -> float | None:
+    """
+    Delay requested by the server's Retry-After header, if given in seconds,
+    capped at MAX_RETRY_AFTER_S.
+    """
+    try:
+        retry_after = float(resp.headers.get("Retry-After"))
+    except (TypeError, ValueError):
+        return None
+    # float() also accepts "nan" and "inf", which time.sleep() rejects
+    if not math.isfinite(retry_after):
+        return None
+    return min(max(retry_after, 0.0), MAX_RETRY_AFTER_S)
+
+
+def _sha256_hex(data: memoryview) -> str:
+    """Hex SHA-256 of an in-memory buffer."""
+    return hashlib.sha256(data).hexdigest()
+
 
 class GitHubArtifactClient:
     """
@@ -19,10 +94,17 @@ class GitHubArtifactClient:
     """
 
     TWIRP_SERVICE = "github.actions.results.api.v1.ArtifactService"
-    RETRYABLE_STATUS_CODES = {502, 503, 504, 429, 500}
+    RETRYABLE_STATUS_CODES = frozenset({502, 503, 504, 429, 500})
     MAX_RETRY_ATTEMPTS = 5
     BASE_RETRY_INTERVAL_S = 3.0
     RETRY_MULTIPLIER = 1.5
+    RETRY_JITTER_S = 0.5
+    # Backoff of 0.25s doubling up to 2s puts the last poll about 8s after
+    # the first, the same window as polling five times at a fixed 2s
+    MAX_POLL_ATTEMPTS = 7
+    BASE_POLL_INTERVAL_S = 0.25
+    MAX_POLL_INTERVAL_S = 2.0
+    POOL_CONNECTIONS = 4
 
     def __init__(self, github_token: str):
         self.runtime_token = os.environ.get("ACTIONS_RUNTIME_TOKEN")
@@ -58,43 +140,31 @@ class GitHubArtifactClient:
             )
 
         # Decode backend IDs from the JWT token
-        self.backend_ids = self._get_backend_ids_from_token()
+        self.backend_ids = dict(_decode_backend_ids(self.runtime_token))
+
+        # One session keeps a connection per host (results service, blob
+        # storage, REST API) alive across the calls of an upload. Requests are
+        # made one at a time, so each host needs a single pooled connection;
+        # retries are handled by _twirp_request, not the adapter.
+        self._session = requests.Session()
+        self._session.mount(
+            "https://",
+            HTTPAdapter(
+                pool_connections=self.POOL_CONNECTIONS,
+                pool_maxsize=1,
+                max_retries=0,
+            ),
+        )
 
-    def _get_backend_ids_from_token(self) -> dict:
-        """
-        Decode the ACTIONS_RUNTIME_TOKEN JWT (without verification) to extract
-        workflowRunBackendId and workflowJobRunBackendId from the 'scp' claim.
+    def __enter__(self) -> "GitHubArtifactClient":
+        return self
 
-        The scp claim looks like:
-          "Actions.ExampleScope Actions.Results:<runBackendId>:<jobBackendId>"
-        """
-        try:
-            parts = self.runtime_token.split(".")
-            if len(parts) < 2:
-                raise ValueError("Token does not have a payload segment")
-
-            payload_b64 = parts[1]
-            # Add padding for base64 decoding
-            padding = 4 - len(payload_b64) % 4
-            if padding != 4:
-                payload_b64 += "=" * padding
-
-            decoded = json.loads(base64.urlsafe_b64decode(payload_b64))
-            scp = decoded.get("scp", "")
-
-            for scope in scp.split(" "):
-                scope_parts = scope.split(":")
-                if scope_parts[0] == "Actions.Results" and len(scope_parts) == 3:
-                    return {
-                        "workflowRunBackendId": scope_parts[1],
-                        "workflowJobRunBackendId": scope_parts[2],
-                    }
+    def __exit__(self, *exc_info) -> None:
+        self.close()
 
-            raise ValueError("No Actions.Results scope found in token claims")
-        except Exception as e:
-            raise click.ClickException(
-                f"Failed to extract backend IDs from ACTIONS_RUNTIME_TOKEN: {e}"
-            )
+    def close(self) -> None:
+        """Closes the pooled connections."""
+        self._session.close()
 
     def _twirp_request(self, method: str, data: dict) -> dict:
         """
@@ -112,11 +182,14 @@ class GitHubArtifactClient:
             "Content-Type": "application/json",
             "Authorization": f"Bearer {self.runtime_token}",
         }
+        # Serialize once up front rather than on every retry attempt
+        body = json.dumps(data, separators=(",", ":")).encode("utf-8")
 
         last_error = None
         for attempt in range(self.MAX_RETRY_ATTEMPTS):
+            retry_after = None
             try:
-                resp = requests.post(url, json=data, headers=headers)
+                resp = self._session.post(url, data=body, headers=headers)
 
                 if 200 <= resp.status_code < 300:
                     return resp.json()
@@ -127,13 +200,19 @@ class GitHubArtifactClient:
                     )
 
                 last_error = f"{resp.status_code} {resp.text}"
+                retry_after = _retry_after_seconds(resp)
             except click.ClickException:
                 raise
             except requests.RequestException as e:
                 last_error = str(e)
 
             if attempt + 1 < self.MAX_RETRY_ATTEMPTS:
-                wait = self.BASE_RETRY_INTERVAL_S * (self.RETRY_MULTIPLIER ** attempt)
+                if retry_after is None:
+                    retry_after = self.BASE_RETRY_INTERVAL_S * (
+                        self.RETRY_MULTIPLIER**attempt
+                    )
+                # Jitter keeps concurrent runners from retrying in lockstep
+                wait = retry_after + random.uniform(0, self.RETRY_JITTER_S)
                 click.echo(
                     f"  Attempt {attempt + 1}/{self.MAX_RETRY_ATTEMPTS} for {method} "
                     f"failed ({last_error}). Retrying in {wait:.1f}s..."
@@ -179,18 +258,27 @@ class GitHubArtifactClient:
 
         # 2. Upload file to Azure Blob Storage
         click.echo(f"  Uploading {file_path.name}...")
-        file_content = file_path.read_bytes()
-        file_size = len(file_content)
-        sha256_hash = hashlib.sha256(file_content).hexdigest()
-
-        upload_resp = requests.put(
-            signed_upload_url,
-            data=file_content,
-            headers={
-                "x-ms-blob-type": "BlockBlob",
-                "Content-Type": "application/octet-stream",
-            },
-        )
+        # Upload straight from a read-only mapping of the archive: urllib3
+        # hands a buffer body to the socket in one sendall instead of copying
+        # it through Python in small read() chunks. The hash runs over the
+        # same mapping in a worker thread (hashlib releases the GIL) while
+        # the PUT is on the wire.
+        with (
+            map_file(file_path) as payload,
+            ThreadPoolExecutor(max_workers=1) as executor,
+        ):
+            file_size = len(payload)
+            digest_future = executor.submit(_sha256_hex, payload)
+            upload_resp = self._session.put(
+                signed_upload_url,
+                data=payload,
+                headers={
+                    "x-ms-blob-type": "BlockBlob",
+                    "Content-Type": "application/octet-stream",
+                    "Content-Length": str(file_size),
+                },
+            )
+            sha256_hash = digest_future.result()
 
         if not upload_resp.ok:
             raise click.ClickException(
@@ -242,15 +330,26 @@ class GitHubArtifactClient:
         }
 
         click.echo("  Fetching artifact download URL...")
-        for _ in range(5):
-            resp = requests.get(api_url, headers=headers)
-            if resp.ok:
+        etag = None
+        for attempt in range(self.MAX_POLL_ATTEMPTS):
+            if etag:
+                # The listing is unchanged if the API answers 304 with no body
+                headers["If-None-Match"] = etag
+
+            resp = self._session.get(api_url, headers=headers)
+            if resp.status_code != 304 and resp.ok:
+                etag = resp.headers.get("ETag")
                 data = resp.json()
                 artifacts = data.get("artifacts", [])
                 for artifact in artifacts:
                     if artifact.get("name") == artifact_name:
                         return artifact.get("archive_download_url")
-            time.sleep(2)
+
+            if attempt + 1 < self.MAX_POLL_ATTEMPTS:
+                # The artifact is usually listed right after FinalizeArtifact,
+                # so start polling quickly and back off from there
+                delay = self.BASE_POLL_INTERVAL_S * (2**attempt)
+                time.sleep(min(delay, self.MAX_POLL_INTERVAL_S))
 
         raise click.ClickException(
             "Could not determine artifact download URL after upload."
@@ -1,12 +1,18 @@
+import os
+import shutil
+import stat
+import subprocess
 import tarfile
 
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Iterable
+from typing import Iterable, Iterator
 from urllib.parse import urlparse
 
 import click
 import requests
 
+from infra_visualiser_action.files import map_file
 from infra_visualiser_action.git import get_commit_timestamp
 
 # Directory names that are language/vendor dependency trees; we skip them when finding markdown.
@@ -26,10 +32,98 @@ VENDOR_DIR_NAMES = frozenset({
     ".tofu",
 })
 
+# File suffixes collected from the recipe directory and from local module directories.
+RECIPE_FILE_SUFFIXES = frozenset({".tf", ".json", ".dot"})
+MODULE_FILE_SUFFIXES = frozenset({".tf"})
 
-def _is_under_vendor_dir(path: Path) -> bool:
-    """True if any path component is a known vendor/dependency directory name."""
-    return any(part in VENDOR_DIR_NAMES for part in path.parts)
+# Copy member payloads into the tar stream in 1 MiB reads rather than tarfile's 16 KiB default.
+TAR_COPY_BUFSIZE = 1 << 20
+
+# The archive is mostly small text files; the fastest gzip level costs little in size.
+ARCHIVE_COMPRESSLEVEL = 1
+
+
+def _arcname_prefix(directory: Path, repo_root: Path) -> str:
+    """Archive-name prefix for files directly inside directory ("" for repo_root)."""
+    rel = directory.relative_to(repo_root).as_posix()
+    return "" if rel == "." else f"{rel}/"
+
+
+def _scan_files(
+    directory: Path, repo_root: Path, suffixes: frozenset[str]
+) -> list[tuple[str, str, os.stat_result]]:
+    """
+    Returns the regular files directly inside directory whose suffix is in
+    suffixes, using a single scandir pass instead of one glob per pattern.
+    Each file comes back as (path, archive name, stat result).
+    """
+    prefix = _arcname_prefix(directory, repo_root)
+    with os.scandir(directory) as it:
+        return [
+            (entry.path, prefix + entry.name, entry.stat())
+            for entry in it
+            if os.path.splitext(entry.name)[1] in suffixes and entry.is_file()
+        ]
+
+
+def _stat_regular_file(path: str) -> os.stat_result | None:
+    """Stat path, returning None if it is missing or not a regular file."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st if stat.S_ISREG(st.st_mode) else None
+
+
+def _file_tarinfo(arcname: str, st: os.stat_result) -> tarfile.TarInfo:
+    """
+    Builds the tar header for a regular file from the stat result gathered
+    during discovery, so tarfile does not stat the file or look up its owner
+    again.
+    """
+    tarinfo = tarfile.TarInfo(arcname)
+    tarinfo.type = tarfile.REGTYPE
+    tarinfo.size = st.st_size
+    tarinfo.mtime = int(st.st_mtime)
+    tarinfo.mode = stat.S_IMODE(st.st_mode)
+    return tarinfo
+
+
+@contextmanager
+def _open_gzip_tar(archive_path: Path) -> Iterator[tarfile.TarFile]:
+    """
+    Opens archive_path as a gzip-compressed tar for writing. Compression is
+    piped through pigz across all cores when it is on PATH, otherwise falls
+    back to tarfile's single-threaded zlib.
+    """
+    pigz = shutil.which("pigz")
+    if not pigz:
+        with tarfile.open(
+            archive_path,
+            "w:gz",
+            compresslevel=ARCHIVE_COMPRESSLEVEL,
+            copybufsize=TAR_COPY_BUFSIZE,
+        ) as tar:
+            yield tar
+        return
+
+    with archive_path.open("wb") as out:
+        proc = subprocess.Popen(
+            [pigz, f"-{ARCHIVE_COMPRESSLEVEL}", "-p", str(os.cpu_count() or 1)],
+            stdin=subprocess.PIPE,
+            stdout=out,
+        )
+        try:
+            with tarfile.open(
+                fileobj=proc.stdin, mode="w|", copybufsize=TAR_COPY_BUFSIZE
+            ) as tar:
+                yield tar
+        finally:
+            proc.stdin.close()
+            returncode = proc.wait()
+
+    if returncode != 0:
+        raise click.ClickException(f"pigz failed with exit code {returncode}")
 
 
 def create_archive(
@@ -45,44 +139,49 @@ def create_archive(
     - Adds .terraform/modules/modules.json if present
     - Adds extra_paths if provided
     """
-    files_to_add: list[Path] = []
-
-    # All relevant files in recipe_dir
-    patterns: list[str] = ["*.tf", "*.json", "*.dot"]
+    # (path, archive name relative to repo_root, stat result)
+    files_to_add: list[tuple[str, str, os.stat_result]] = []
 
     if include_markdown:
-        for p in Path(repo_root).rglob("*.md"):
-            if not p.is_file():
-                continue
-            if _is_under_vendor_dir(p):
-                continue
-            files_to_add.append(p.resolve())
+        for dirpath, dirnames, filenames in os.walk(repo_root):
+            # Prune vendor/dependency trees so the walk never descends into them
+            dirnames[:] = [d for d in dirnames if d not in VENDOR_DIR_NAMES]
+            prefix = None
+            for fname in filenames:
+                if not fname.endswith(".md"):
+                    continue
+                p = os.path.join(dirpath, fname)
+                st = _stat_regular_file(p)
+                if st is None:
+                    continue
+                if prefix is None:
+                    prefix = _arcname_prefix(Path(dirpath), repo_root)
+                files_to_add.append((p, prefix + fname, st))
 
-    for pattern in patterns:
-        for p in recipe_dir.glob(pattern):
-            if p.is_file():
-                files_to_add.append(p.resolve())
+    # All relevant files in recipe_dir
+    files_to_add.extend(_scan_files(recipe_dir, repo_root, RECIPE_FILE_SUFFIXES))
 
     # Extra paths (e.g. local modules)
     if extra_paths:
         for p in extra_paths:
-            if not p.exists():
+            try:
+                st = p.stat()
+            except FileNotFoundError:
                 continue
 
-            if not p.is_dir():
-                files_to_add.append(p.resolve())
+            if not stat.S_ISDIR(st.st_mode):
+                files_to_add.append((str(p), p.relative_to(repo_root).as_posix(), st))
+                continue
 
-            for tf_file in p.glob("*.tf"):
-                if tf_file.is_file():
-                    files_to_add.append(tf_file.resolve())
+            files_to_add.extend(_scan_files(p, repo_root, MODULE_FILE_SUFFIXES))
 
     archive_path.parent.mkdir(parents=True, exist_ok=True)
-    with tarfile.open(archive_path, "w:gz") as tar:
-        for p in files_to_add:
-            archive_name = str(p.relative_to(repo_root))
+    with _open_gzip_tar(archive_path) as tar:
+        for p, archive_name, st in files_to_add:
             click.echo(f"Adding file to archive: {p} as path {archive_name}")
             # Store paths relative to repo root for stability
-            tar.add(p, arcname=archive_name)
+            with open(p, "rb") as f:
+                tar.addfile(_file_tarinfo(archive_name, st), f)
 
     archive_size = archive_path.stat().st_size
     size_mb = archive_size / (1024 * 1024)
@@ -109,15 +208,17 @@ def upload_archive_to_host(
     url = host.rstrip("/")
     commit_ts = get_commit_timestamp()
 
-    with archive_path.open("rb") as f:
-        files = {"file": (archive_path.name, f, "application/gzip")}
-        data = {
-            "commit_timestamp": commit_ts,
-            "recipe_path": recipe_path,
-            "recipe_nickname": recipe_nickname,
-        }
-        headers = {"Authorization": f"Bearer {oidc_token}"}
+    data = {
+        "commit_timestamp": commit_ts,
+        "recipe_path": recipe_path,
+        "recipe_nickname": recipe_nickname,
+    }
+    headers = {"Authorization": f"Bearer {oidc_token}"}
 
+    # requests builds the multipart body in memory; handing it a view of a
+    # read-only mapping spares it reading the archive into a bytes copy first.
+    with map_file(archive_path) as payload:
+        files = {"file": (archive_path.name, payload, "application/gzip")}
         resp = requests.post(
             f"{url}/api/v1/upload-terraform-recipe",
             headers=headers,
@@ -126,10 +227,10 @@ def upload_archive_to_host(
             timeout=300,
         )
 
-        if not resp.ok:
-            raise click.ClickException(
-                f"Upload failed with status {resp.status_code}: {resp.text}"
-            )
+    if not resp.ok:
+        raise click.ClickException(
+            f"Upload failed with status {resp.status_code}: {resp.text}"
+        )
 
 
 def notify_server(
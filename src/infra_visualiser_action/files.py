@@ -0,0 +1,25 @@
+import mmap
+import os
+
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+
+
+@contextmanager
+def map_file(path: Path) -> Iterator[memoryview]:
+    """
+    Yields a read-only view of the file at path backed by mmap, so its bytes
+    are never copied into Python memory. Empty files cannot be mapped and
+    yield an empty view instead.
+    """
+    with path.open("rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            yield memoryview(b"")
+            return
+
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if hasattr(mmap, "MADV_SEQUENTIAL"):
+                mm.madvise(mmap.MADV_SEQUENTIAL)
+            with memoryview(mm) as view:
+                yield view
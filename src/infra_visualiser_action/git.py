@@ -1,12 +1,15 @@
+import functools
 import os
 import subprocess
-import time
 
-from pathlib import Path
+from datetime import datetime, timezone
+from pathlib import Path, PurePosixPath
 from typing import Iterable
 
 import click
 
+TERRAFORM_SUFFIXES = frozenset({".tf", ".tfvars"})
+
 
 def mark_dir_safe(dir: Path) -> None:
     """
@@ -22,6 +25,38 @@ def mark_dir_safe(dir: Path) -> None:
         raise click.ClickException(f"Could not mark repository as safe: {e}")
 
 
+# Marks a trie node that corresponds to a complete candidate directory
+_TRIE_END = None
+
+
+def _build_dir_trie(dirs: Iterable[Path]) -> dict:
+    """
+    Builds a prefix trie over the path components of the given directories
+    so that ancestor lookups cost O(depth) regardless of how many there are.
+    """
+    trie: dict = {}
+    for d in dirs:
+        node = trie
+        for part in d.parts:
+            node = node.setdefault(part, {})
+        node[_TRIE_END] = True
+    return trie
+
+
+def _is_under_trie(trie: dict, parts: tuple[str, ...]) -> bool:
+    """True if the directory given by parts is, or is inside, a trie entry."""
+    node = trie
+    if _TRIE_END in node:
+        return True
+    for part in parts:
+        node = node.get(part)
+        if node is None:
+            return False
+        if _TRIE_END in node:
+            return True
+    return False
+
+
 def has_terraform_changes_in_paths(
     candidate_dirs: Iterable[Path],
     repo_root: Path,
@@ -31,8 +66,9 @@ def has_terraform_changes_in_paths(
     Terraform-related files (*.tf, *.tfvars) have changed in one of the
     given directories.
 
-    Returns True if at least one of the candidate directories contains a
-    changed Terraform-related file, otherwise False.
+    Returns True if at least one of the candidate directories (or any of
+    their subdirectories) contains a changed Terraform-related file,
+    otherwise False.
     """
 
     sha = os.environ.get("GITHUB_SHA")
@@ -49,7 +85,7 @@ def has_terraform_changes_in_paths(
 
     try:
         changed_files_output: str = subprocess.check_output(
-            ["git", "diff", "--name-only", diff_range],
+            ["git", "diff", "--name-only", "-z", diff_range],
             text=True,
             cwd=repo_root,
         )
@@ -83,41 +119,54 @@ def has_terraform_changes_in_paths(
         if Path(github_workflow_ref).exists():
             github_workflow_path = github_workflow_ref
 
-    terraform_dirs: set[Path] = set()
-    for line in changed_files_output.splitlines():
-        rel = line.strip()
+    candidate_dirs = list(candidate_dirs)
+    candidate_trie = _build_dir_trie(candidate_dirs)
+    terraform_dirs: set[PurePosixPath] = set()
+    for rel in changed_files_output.split("\0"):
         if not rel:
             continue
 
-        file_path = (repo_root / rel).resolve().relative_to(repo_root)
-        if str(file_path) == github_workflow_path:
-            click.echo(f"GitHub workflow file changed: {file_path}")
+        # git already reports repo-relative POSIX paths, so there is no need
+        # to resolve them against the filesystem
+        if rel == github_workflow_path:
+            click.echo(f"GitHub workflow file changed: {rel}")
             return True
 
-        if file_path.suffix in {".tf", ".tfvars"}:
+        file_path = PurePosixPath(rel)
+        if file_path.suffix in TERRAFORM_SUFFIXES:
+            if _is_under_trie(candidate_trie, file_path.parent.parts):
+                click.echo(f"🔍 Terraform directory changed: {file_path.parent}")
+                return True
             terraform_dirs.add(file_path.parent)
 
-    if not terraform_dirs:
-        return False
-
-    click.echo(f"🔍 Terraform directories changed: {terraform_dirs}")
-    click.echo(f"🔍 Candidate directories: {candidate_dirs}")
-    click.echo(f"🔍 Intersection: {set(candidate_dirs) & terraform_dirs}")
-    return len(set(candidate_dirs) & terraform_dirs) > 0
+    if terraform_dirs:
+        click.echo(f"🔍 Terraform directories changed: {terraform_dirs}")
+        click.echo(f"🔍 Candidate directories: {candidate_dirs}")
+    return False
 
 
 def get_commit_timestamp() -> str:
     """
-    Gets the commit timestamp from Git metadata if available.
+    Gets the commit timestamp from Git metadata if available. The lookup
+    runs once per commit per process; later calls reuse its result.
     """
-    sha = os.environ.get("GITHUB_SHA", "unknown")
+    return _commit_timestamp(os.environ.get("GITHUB_SHA", "unknown"))
+
 
+@functools.lru_cache(maxsize=8)
+def _commit_timestamp(sha: str) -> str:
     try:
+        # `git log -1` skips the diff machinery of `git show`, and int() parses
+        # the raw bytes directly (surrounding whitespace included).
         commit_ts = subprocess.check_output(
-            ["git", "show", "--no-patch", "--format=%ct", sha],
-            text=True,
-        ).strip()
-        return time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(int(commit_ts)))
+            ["git", "-c", "core.pager=cat", "log", "-1", "--format=%ct", sha],
+            env={**os.environ, "GIT_OPTIONAL_LOCKS": "0"},
+        )
+        return (
+            datetime.fromtimestamp(int(commit_ts), tz=timezone.utc)
+            .replace(tzinfo=None)
+            .isoformat(timespec="seconds")
+        )
     except Exception as e:
         raise click.ClickException(
             f"Failed to get commit timestamp from Git metadata: {e}"
@@ -1,16 +1,52 @@
+import base64
+import json
 import os
+import time
 
 import click
 import requests
 
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
-def get_oidc_token_for_host(host: str) -> str:
+# Shared session so token requests reuse connections, with retries on
+# transient server errors from the GitHub OIDC endpoint.
+_SESSION = requests.Session()
+_SESSION.headers["Accept"] = "application/json"
+_SESSION.mount(
+    "https://",
+    HTTPAdapter(
+        max_retries=Retry(
+            total=3,
+            backoff_factor=0.3,
+            status_forcelist=(500, 502, 503, 504),
+            raise_on_status=False,
+        )
+    ),
+)
+
+# Tokens are reused per request URL (which carries the audience) until this
+# many seconds before they expire.
+TOKEN_EXPIRY_MARGIN_S = 30
+_TOKEN_CACHE: dict[str, tuple[str, float]] = {}
+
+
+def _token_expiry(token: str) -> float | None:
+    """The token's 'exp' claim, or None if it cannot be read from the JWT."""
+    try:
+        payload_b64 = token.split(".", 2)[1].encode("ascii")
+        claims = json.loads(
+            base64.urlsafe_b64decode(payload_b64 + b"=" * (-len(payload_b64) % 4))
+        )
+        return float(claims["exp"])
+    except (IndexError, KeyError, TypeError, ValueError):
+        return None
+
+
+def get_oidc_request_env() -> tuple[str, str]:
     """
-    Uses GitHub's OIDC endpoint inside Actions to get a token with the given
-    audience.
-    Requires:
-      - ACTIONS_ID_TOKEN_REQUEST_URL
-      - ACTIONS_ID_TOKEN_REQUEST_TOKEN
+    Returns the OIDC request URL and token GitHub exposes to jobs with the
+    id-token: write permission, or raises if either is missing.
     """
     req_url = os.environ.get("ACTIONS_ID_TOKEN_REQUEST_URL")
     req_token = os.environ.get("ACTIONS_ID_TOKEN_REQUEST_TOKEN")
@@ -21,6 +57,19 @@ def get_oidc_token_for_host(host: str) -> str:
             + "must be set in GitHub Actions."
         )
 
+    return req_url, req_token
+
+
+def get_oidc_token_for_host(host: str) -> str:
+    """
+    Uses GitHub's OIDC endpoint inside Actions to get a token with the given
+    audience. Tokens are cached until shortly before they expire.
+    Requires:
+      - ACTIONS_ID_TOKEN_REQUEST_URL
+      - ACTIONS_ID_TOKEN_REQUEST_TOKEN
+    """
+    req_url, req_token = get_oidc_request_env()
+
     # Ensure audience param is appended
     if "audience=" in req_url:
         url = req_url
@@ -28,7 +77,11 @@ def get_oidc_token_for_host(host: str) -> str:
         sep = "&" if "?" in req_url else "?"
         url = f"{req_url}{sep}audience={host}"
 
-    resp = requests.get(
+    cached = _TOKEN_CACHE.get(url)
+    if cached and cached[1] - time.time() > TOKEN_EXPIRY_MARGIN_S:
+        return cached[0]
+
+    resp = _SESSION.get(
         url,
         headers={"Authorization": f"bearer {req_token}"},
         timeout=30,
@@ -39,4 +92,8 @@ def get_oidc_token_for_host(host: str) -> str:
     if not token:
         raise click.ClickException("Failed to obtain OIDC token from GitHub.")
 
+    expiry = _token_expiry(token)
+    if expiry is not None:
+        _TOKEN_CACHE[url] = (token, expiry)
+
     return token
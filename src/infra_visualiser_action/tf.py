@@ -1,47 +1,97 @@
+import functools
 import json
 import os
+import re
+import shutil
 import subprocess
 import sys
 import tempfile
 import time
 
+from collections import deque
+from contextlib import ExitStack
 from dataclasses import dataclass
+from itertools import islice
 from pathlib import Path
+from typing import Iterator
 
 import click
 
+# Forces a local backend so plans never touch the recipe's real remote state.
+BACKEND_OVERRIDE_FILENAME = "backend_override.tf"
+BACKEND_OVERRIDE_TF = """terraform {
+    backend "local" { path = "terraform.tfstate" }
+}"""
+
+# Skip common hidden or irrelevant dirs when looking for .tfvars files
+TFVARS_SKIP_DIRS = frozenset(
+    {
+        "venv",
+        "__pycache__",
+    }
+)
+
+# Characters in an attempt label that cannot appear in its log file name
+_LOG_LABEL_TRANS = str.maketrans({os.sep: "_", " ": "_"})
 
-@dataclass
+# Upper bound on plan attempts running at once
+MAX_CONCURRENT_PLANS = 4
+
+# Seconds a stopped plan attempt gets to exit before it is killed
+PLAN_TERMINATE_TIMEOUT_S = 5
+
+# Module sources with one of these prefixes are fetched remotely, not local dirs
+REMOTE_MODULE_SOURCE_RE = re.compile(
+    r"(?:registry\.terraform\.io/|registry\.opentofu\.org/|github\.com/|bitbucket\.org/"
+    r"|git::|git@|hg::|s3::|gcs::|ssh://|https?://)"
+)
+
+
+@dataclass(slots=True, frozen=True)
 class PlanAttempt:
     env_label: str
     var_file: Path | None
     success: bool
-    log_path: Path
+    # Only failed attempts have their output written to disk
+    log_path: Path | None
 
 
 def find_tfvars_files(repo_root: Path) -> list[Path]:
     """
-    This function finds all .tfvars files in the repository.
+    This function finds all .tfvars files in the repository. The walk runs
+    once per repository root per process; later calls reuse its result.
     """
-    tfvars_files: list[Path] = []
+    return list(_find_tfvars_cached(str(repo_root.resolve())))
 
-    # Skip common hidden or irrelevant dirs
-    skip_dirs = {
-        "venv",
-        "__pycache__",
-    }
 
-    for root, dirs, files in os.walk(repo_root):
-        # Filter out unwanted directories in-place
-        # ., .., .git, .github, .terraform, .venv will be filtered out by
-        # checking for starts with "."
-        condition = lambda d: d not in skip_dirs and not d.startswith(".")
-        dirs[:] = [d for d in dirs if condition(d)]
-        for fname in files:
-            if fname.endswith(".tfvars"):
-                tfvars_files.append(Path(root) / fname)
+@functools.lru_cache(maxsize=32)
+def _find_tfvars_cached(repo_root: str) -> tuple[Path, ...]:
+    tfvars_files: list[Path] = []
 
-    return sorted(tfvars_files)
+    # Iterative DFS over scandir so the d_type cached on each DirEntry answers
+    # is_dir() without an extra stat per entry
+    stack: list[str] = [repo_root]
+    while stack:
+        try:
+            it = os.scandir(stack.pop())
+        except OSError:
+            # os.walk silently skipped unreadable directories, keep doing so
+            continue
+
+        with it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    # .git, .github, .terraform, .venv will be filtered out by
+                    # checking the first character, which rejects most
+                    # skipped dirs before the set lookup
+                    name = entry.name
+                    if name[0] != "." and name not in TFVARS_SKIP_DIRS:
+                        stack.append(entry.path)
+                elif entry.name.endswith(".tfvars"):
+                    tfvars_files.append(Path(entry.path))
+
+    tfvars_files.sort()
+    return tuple(tfvars_files)
 
 
 def _get_binary(use_terraform: bool) -> str:
@@ -49,17 +99,13 @@ def _get_binary(use_terraform: bool) -> str:
     return "terraform" if use_terraform else "tofu"
 
 
-def _run_init(use_terraform: bool = False) -> Path:
+def _run_init(recipe_dir: Path, use_terraform: bool = False) -> Path:
     binary = _get_binary(use_terraform)
-    backend_file = Path("backend_override.tf")
-    backend_file.write_text(
-        """terraform {
-    backend "local" { path = "terraform.tfstate" }
-}""",
-        encoding="utf-8",
-    )
+    backend_file = recipe_dir / BACKEND_OVERRIDE_FILENAME
+    backend_file.write_text(BACKEND_OVERRIDE_TF, encoding="utf-8")
     init_proc = subprocess.run(
         [binary, "init", "-input=false"],
+        cwd=recipe_dir,
         check=False,
         stdout=sys.stdout,
         stderr=sys.stderr,
@@ -73,60 +119,157 @@ def _run_init(use_terraform: bool = False) -> Path:
     return backend_file
 
 
-def _run_plan(
-    env_label: str, extra_args: list[str], use_terraform: bool = False
-) -> PlanAttempt:
-    binary = _get_binary(use_terraform)
-    ts = int(time.time())
-    safe_label = env_label.replace(os.sep, "_").replace(" ", "_")
-    log_path = Path(tempfile.gettempdir()) / f"{binary}_plan_{safe_label}_{ts}.log"
-
-    cmd = [binary, "plan", "-out=tfplan", "-input=false"] + extra_args
-    click.echo(f"  🔍 Running command: {' '.join(cmd)}")
-    with log_path.open("w", encoding="utf-8") as log_file:
-        log_file.write(f"$ {' '.join(cmd)}\n\n")
-        proc = subprocess.run(
-            cmd,
-            stdout=log_file,
-            stderr=log_file,
-            text=True,
+class _PlanProcess:
+    """
+    A running plan attempt. Output is buffered in an anonymous temporary
+    file and only written to a log if the plan fails, since the log of a
+    successful attempt is never read.
+    """
+
+    def __init__(
+        self,
+        env_label: str,
+        extra_args: list[str],
+        use_terraform: bool = False,
+        plan_file: str = "tfplan",
+        cwd: Path | None = None,
+        run_ts: int | None = None,
+    ) -> None:
+        self.env_label = env_label
+        self.extra_args = extra_args
+        self.binary = _get_binary(use_terraform)
+        self.plan_file = plan_file
+        self.run_ts = run_ts
+
+        # Attempts run concurrently against the same local state, so they must
+        # not contend for the state lock; plan never writes state anyway.
+        cmd = [
+            self.binary,
+            "plan",
+            f"-out={plan_file}",
+            "-input=false",
+            "-lock=false",
+        ] + extra_args
+        self.cmd_line = " ".join(cmd)
+        click.echo(f"  🔍 Running command: {self.cmd_line}")
+        # A file rather than a pipe, so nothing has to drain the output while
+        # the main thread is waiting on another attempt
+        self._output = tempfile.TemporaryFile()
+        try:
+            self._proc = subprocess.Popen(
+                cmd,
+                cwd=cwd,
+                stdout=self._output,
+                stderr=subprocess.STDOUT,
+            )
+        except BaseException:
+            self._output.close()
+            raise
+
+    def wait(self) -> PlanAttempt:
+        """Waits for the plan to finish and reports the attempt."""
+        with self._output:
+            returncode = self._proc.wait()
+
+            log_path = None
+            if returncode != 0:
+                ts = int(time.time()) if self.run_ts is None else self.run_ts
+                safe_label = self.env_label.translate(_LOG_LABEL_TRANS)
+                log_path = (
+                    Path(tempfile.gettempdir())
+                    / f"{self.binary}_plan_{safe_label}_{self.plan_file}_{ts}.log"
+                )
+                self._output.seek(0)
+                with log_path.open("wb") as log_file:
+                    log_file.write(f"$ {self.cmd_line}\n\n".encode("utf-8"))
+                    shutil.copyfileobj(self._output, log_file)
+
+        return PlanAttempt(
+            env_label=self.env_label,
+            var_file=(
+                self.extra_args[-1]
+                if self.extra_args and self.extra_args[-1].endswith(".tfvars")
+                else None
+            ),
+            success=returncode == 0,
+            log_path=log_path,
         )
 
-    return PlanAttempt(
-        env_label=env_label,
-        var_file=(
-            extra_args[-1]
-            if extra_args and extra_args[-1].endswith(".tfvars")
-            else None
-        ),
-        success=proc.returncode == 0,
-        log_path=log_path,
+    def kill(self) -> None:
+        """
+        Stops an attempt whose result is no longer needed and discards its
+        output. Plans are asked to stop first, so providers can clean up.
+        """
+        with self._output:
+            self._proc.terminate()
+            try:
+                self._proc.wait(timeout=PLAN_TERMINATE_TIMEOUT_S)
+            except subprocess.TimeoutExpired:
+                self._proc.kill()
+                self._proc.wait()
+
+
+def _start_plan(
+    env_label: str,
+    extra_args: list[str],
+    use_terraform: bool = False,
+    plan_file: str = "tfplan",
+    cwd: Path | None = None,
+    run_ts: int | None = None,
+) -> _PlanProcess:
+    return _PlanProcess(
+        env_label,
+        extra_args,
+        use_terraform=use_terraform,
+        plan_file=plan_file,
+        cwd=cwd,
+        run_ts=run_ts,
     )
 
 
 def _generate_plan_and_graph(recipe_dir: Path, use_terraform: bool = False) -> None:
     binary = _get_binary(use_terraform)
+    # Output goes straight from each subprocess to its file descriptor;
+    # nothing here needs to parse it.
+    commands: list[tuple[list[str], str]] = [
+        ([binary, "graph"], "terraform_graph.dot"),
+        ([binary, "providers", "schema", "-json"], "provider_schema.json"),
+    ]
     # Convert tfplan (if exists) to JSON
     tfplan_path = recipe_dir / "tfplan"
     if tfplan_path.exists():
-        with (recipe_dir / "tfplan.json").open("w", encoding="utf-8") as f:
-            show_cmd = [binary, "show", "-json", "tfplan"]
-            subprocess.run(show_cmd, check=False, stdout=f, text=True)
+        commands.insert(0, ([binary, "show", "-json", "tfplan"], "tfplan.json"))
     else:
         # Fallback empty plan
         (recipe_dir / "tfplan.json").write_text("{}", encoding="utf-8")
 
-    # Graph & providers schema
-    with (recipe_dir / "terraform_graph.dot").open("w", encoding="utf-8") as f:
-        subprocess.run([binary, "graph"], check=False, stdout=f, text=True)
+    # The commands are independent of each other, so run them side by side
+    # and wait for all of them rather than one after another
+    with ExitStack() as stack:
+        procs = []
+        for cmd, output_name in commands:
+            f = stack.enter_context((recipe_dir / output_name).open("wb"))
+            proc = subprocess.Popen(cmd, cwd=recipe_dir, stdout=f)
+            # If a later command cannot be started, stop the ones already
+            # running instead of leaving them behind
+            stack.callback(_stop_process, proc)
+            procs.append(proc)
+        for proc in procs:
+            proc.wait()
 
-    with (recipe_dir / "provider_schema.json").open("w", encoding="utf-8") as f:
-        subprocess.run(
-            [binary, "providers", "schema", "-json"],
-            check=False,
-            stdout=f,
-            text=True,
-        )
+
+def _stop_process(proc: subprocess.Popen) -> None:
+    """Terminates and reaps proc if it is still running."""
+    if proc.poll() is None:
+        proc.terminate()
+        proc.wait()
+
+
+def _planned_attempts(tfvars_files: list[Path]) -> Iterator[tuple[str, list[str]]]:
+    """Yields (env_label, extra plan args) for each attempt, defaults first."""
+    yield "defaults", []
+    for var_file in tfvars_files:
+        yield var_file.name, ["-var-file", str(var_file)]
 
 
 def run_plans(
@@ -135,56 +278,97 @@ def run_plans(
     use_terraform: bool = False,
 ) -> tuple[list[PlanAttempt], bool]:
     """
-    This function changes the working directory into the recipe directory and
-    runs terraform/tofu plans for all .tfvars files. It returns a list of attempts
-    and a boolean indicating if any attempt was successful. All output from the
-    plans is logged to a temporary file.
+    This function runs terraform/tofu plans in the recipe directory for all
+    .tfvars files concurrently. It returns the attempts up to and including
+    the first successful one (in planned order) and a boolean indicating if
+    any attempt was successful. The output of each failed plan is logged to a
+    temporary file.
+
+    Every command runs with the recipe directory as its cwd, so the process
+    working directory is never changed.
 
     By default, uses OpenTofu. Set use_terraform=True to use Terraform instead.
     """
     binary = _get_binary(use_terraform)
 
-    original_cwd = Path.cwd()
     attempts: list[PlanAttempt] = []
 
     if not recipe_dir.is_dir():
         raise click.ClickException(f"Recipe directory does not exist: {recipe_dir}")
 
-    planned_attempts: list[tuple[str, list[str]]] = [("defaults", [])]
-    planned_attempts.extend(
-        (var_file.name, ["-var-file", str(var_file)]) for var_file in tfvars_files
-    )
-
     backend_file = None
 
     try:
-        click.echo(f"  📁 Changing working directory to {recipe_dir}...")
-        os.chdir(recipe_dir)
-
-        click.echo(f"  ⚙️ Running {binary} init...")
-        backend_file = _run_init(use_terraform=use_terraform)
-
-        for env_label, extra_args in planned_attempts:
-            click.echo(f"  ⚙️ Running {binary} plan for {env_label}...")
-            attempt = _run_plan(env_label, extra_args, use_terraform=use_terraform)
-            attempts.append(attempt)
-            if attempt.success:
-                click.echo("  ✅ Successfully ran " + f"{binary} plan for {env_label}")
+        click.echo(f"  ⚙️ Running {binary} init in {recipe_dir}...")
+        backend_file = _run_init(recipe_dir, use_terraform=use_terraform)
+
+        # Attempts only differ by -var-file, so run them concurrently, each
+        # writing its own plan file. The earliest successful attempt in
+        # planned order still wins, exactly as when they ran one by one.
+        # Attempts are pulled from the plan lazily and only a bounded window
+        # of them is in flight; once a winner is known the rest of its window
+        # is stopped and nothing past it is started.
+        max_in_flight = min(MAX_CONCURRENT_PLANS, os.cpu_count() or 1)
+        # One timestamp for the whole run; the plan file keeps log names unique
+        run_ts = int(time.time())
+        planned = _planned_attempts(tfvars_files)
+        plan_files: list[str] = []
+        in_flight: deque[_PlanProcess] = deque()
+        winner: PlanAttempt | None = None
+        try:
+            while True:
+                for env_label, extra_args in islice(
+                    planned, max_in_flight - len(in_flight)
+                ):
+                    plan_file = f"tfplan_{len(plan_files)}"
+                    plan_files.append(plan_file)
+                    click.echo(f"  ⚙️ Running {binary} plan for {env_label}...")
+                    in_flight.append(
+                        _start_plan(
+                            env_label,
+                            extra_args,
+                            use_terraform=use_terraform,
+                            plan_file=plan_file,
+                            cwd=recipe_dir,
+                            run_ts=run_ts,
+                        )
+                    )
+
+                if not in_flight:
+                    break
+
+                attempt = in_flight.popleft().wait()
+                attempts.append(attempt)
+                if attempt.success:
+                    winner = attempt
+                    break
+
+            # Later attempts can no longer win; stop them before touching
+            # their plan files
+            while in_flight:
+                in_flight.popleft().kill()
+
+            if winner is not None:
+                click.echo(
+                    "  ✅ Successfully ran " + f"{binary} plan for {winner.env_label}"
+                )
+                winning_plan = recipe_dir / plan_files[len(attempts) - 1]
+                if winning_plan.exists():
+                    os.replace(winning_plan, recipe_dir / "tfplan")
                 _generate_plan_and_graph(
                     recipe_dir=recipe_dir, use_terraform=use_terraform
                 )
-                click.echo(f"  📊 Generated plan and graph for {env_label}")
+                click.echo(f"  📊 Generated plan and graph for {winner.env_label}")
                 return attempts, True
+        finally:
+            while in_flight:
+                in_flight.popleft().kill()
+            for plan_file in plan_files:
+                (recipe_dir / plan_file).unlink(missing_ok=True)
 
     finally:
-        if backend_file and backend_file.exists():
-            backend_file.unlink()
-
-        click.echo(
-            "  📁 Changing working directory to original directory"
-            + f" {original_cwd}..."
-        )
-        os.chdir(original_cwd)
+        if backend_file:
+            backend_file.unlink(missing_ok=True)
 
     return attempts, False
 
@@ -202,10 +386,22 @@ def find_local_modules_from_modules_json(
     if not modules_json_path.is_file():
         return []
 
-    data = json.loads(modules_json_path.read_text(encoding="utf-8"))
+    data = json.loads(modules_json_path.read_bytes())
     modules = data.get("Modules") or data.get("modules") or []
 
-    local_paths: list[Path] = [modules_json_path]
+    local_paths: set[Path] = {modules_json_path}
+
+    # Many module calls share a Dir or Source, so each distinct relative path
+    # is resolved (and checked for existence) once, against a recipe dir that
+    # is itself only resolved once.
+    recipe_root = os.path.realpath(recipe_dir)
+    resolved: dict[str, Path | None] = {}
+
+    def _resolve_local(rel: str) -> Path | None:
+        if rel not in resolved:
+            real = os.path.realpath(os.path.join(recipe_root, rel))
+            resolved[rel] = Path(real) if os.path.exists(real) else None
+        return resolved[rel]
 
     for m in modules:
         # Try multiple keys used in practice
@@ -215,29 +411,19 @@ def find_local_modules_from_modules_json(
 
         # Prefer explicit directory if present
         if module_dir and module_dir != ".":
-            candidate = (recipe_dir / module_dir).resolve()
-            click.echo(f"  ✅ found terraform module: {candidate}")
+            candidate = _resolve_local(module_dir)
+            click.echo(f"  ✅ found terraform module: {candidate or module_dir}")
         elif source:
             click.echo(f"  🔎 checking if {module_dir} is a local directory")
-            # Heuristic: treat relative or ./ paths as local
-            if (
-                source.startswith("./")
-                or source.startswith("../")
-                or not any(
-                    source.startswith(prefix)
-                    for prefix in (
-                        "registry.terraform.io/",
-                        "github.com/",
-                        "git::",
-                        "ssh://",
-                        "https://",
-                    )
+            # Heuristic: treat relative, ./ or ../ paths (anything without a
+            # known remote prefix) as local
+            if not REMOTE_MODULE_SOURCE_RE.match(source):
+                candidate = _resolve_local(source)
+                click.echo(
+                    f"  ✅ adding {candidate or source} to list of local modules"
                 )
-            ):
-                candidate = (recipe_dir / source).resolve()
-                click.echo(f"  ✅ adding {candidate} to list of local modules")
 
-        if candidate and candidate.exists():
-            local_paths.append(candidate)
+        if candidate:
+            local_paths.add(candidate)
 
-    return set(local_paths)
+    return local_paths
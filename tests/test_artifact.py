@@ -1,13 +1,15 @@
 import base64
+import hashlib
 import json
-import os
 
-from unittest.mock import MagicMock, patch, call
+from pathlib import Path
+from unittest.mock import Mock, patch
 
 import pytest
 import click
+import requests
 
-from infra_visualiser_action.artifact import GitHubArtifactClient
+from infra_visualiser_action.artifact import MAX_RETRY_AFTER_S, GitHubArtifactClient, _decode_backend_ids
 
 
 def _make_jwt_token(
@@ -29,38 +31,49 @@ FAKE_JOB_BACKEND_ID = "ca395085-040a-526b-2ce8-bdc85f692774"
 FAKE_TOKEN = _make_jwt_token(FAKE_RUN_BACKEND_ID, FAKE_JOB_BACKEND_ID)
 
 
+def _set_env(monkeypatch, env_vars, missing=()):
+    """Set env_vars and remove the missing names, touching nothing else in os.environ."""
+    for name, value in env_vars.items():
+        monkeypatch.setenv(name, value)
+    for name in missing:
+        monkeypatch.delenv(name, raising=False)
+    return env_vars
+
+
 @pytest.fixture
-def mock_env():
-    env_vars = {
+def mock_env(monkeypatch):
+    return _set_env(monkeypatch, {
         "ACTIONS_RUNTIME_TOKEN": FAKE_TOKEN,
         "ACTIONS_RESULTS_URL": "https://results.example.com/",
         "GITHUB_RUN_ID": "12345",
         "GITHUB_REPOSITORY": "owner/repo",
-    }
-    with patch.dict(os.environ, env_vars):
-        yield env_vars
+    })
 
 
 @pytest.fixture
-def mock_missing_token_env():
-    env_vars = {
-        "ACTIONS_RESULTS_URL": "https://results.example.com/",
-        "GITHUB_RUN_ID": "12345",
-        "GITHUB_REPOSITORY": "owner/repo",
-    }
-    with patch.dict(os.environ, env_vars, clear=True):
-        yield env_vars
+def mock_missing_token_env(monkeypatch):
+    return _set_env(
+        monkeypatch,
+        {
+            "ACTIONS_RESULTS_URL": "https://results.example.com/",
+            "GITHUB_RUN_ID": "12345",
+            "GITHUB_REPOSITORY": "owner/repo",
+        },
+        missing=["ACTIONS_RUNTIME_TOKEN"],
+    )
 
 
 @pytest.fixture
-def mock_missing_results_url_env():
-    env_vars = {
-        "ACTIONS_RUNTIME_TOKEN": FAKE_TOKEN,
-        "GITHUB_RUN_ID": "12345",
-        "GITHUB_REPOSITORY": "owner/repo",
-    }
-    with patch.dict(os.environ, env_vars, clear=True):
-        yield env_vars
+def mock_missing_results_url_env(monkeypatch):
+    return _set_env(
+        monkeypatch,
+        {
+            "ACTIONS_RUNTIME_TOKEN": FAKE_TOKEN,
+            "GITHUB_RUN_ID": "12345",
+            "GITHUB_REPOSITORY": "owner/repo",
+        },
+        missing=["ACTIONS_RESULTS_URL"],
+    )
 
 
 # ---------------------------------------------------------------------------
@@ -97,11 +110,25 @@ def test_init_success(mock_env):
     assert client.backend_ids["workflowJobRunBackendId"] == FAKE_JOB_BACKEND_ID
 
 
+@patch("infra_visualiser_action.artifact.requests")
+def test_client_shares_one_pooled_session_and_closes_it(mock_requests, mock_env):
+    """All hosts share one session with a sized pool, closed when the client exits."""
+    with GitHubArtifactClient(github_token="gh_token"):
+        mock_requests.Session.assert_called_once_with()
+        mock_session = mock_requests.Session.return_value
+        prefix, adapter = mock_session.mount.call_args.args
+        assert prefix == "https://"
+        assert adapter._pool_connections == GitHubArtifactClient.POOL_CONNECTIONS
+        mock_session.close.assert_not_called()
+
+    mock_session.close.assert_called_once_with()
+
+
 # ---------------------------------------------------------------------------
 # JWT decoding tests
 # ---------------------------------------------------------------------------
 
-def test_init_raises_if_jwt_has_no_results_scope():
+def test_init_raises_if_jwt_has_no_results_scope(monkeypatch):
     """ClickException if the JWT has no Actions.Results scope."""
     header = base64.urlsafe_b64encode(json.dumps({"alg": "none"}).encode()).rstrip(b"=").decode()
     payload = base64.urlsafe_b64encode(json.dumps({"scp": "Actions.SomeOtherScope"}).encode()).rstrip(b"=").decode()
@@ -113,12 +140,12 @@ def test_init_raises_if_jwt_has_no_results_scope():
         "GITHUB_RUN_ID": "12345",
         "GITHUB_REPOSITORY": "owner/repo",
     }
-    with patch.dict(os.environ, env_vars):
-        with pytest.raises(click.ClickException, match="Failed to extract backend IDs"):
-            GitHubArtifactClient(github_token="gh_token")
+    _set_env(monkeypatch, env_vars)
+    with pytest.raises(click.ClickException, match="Failed to extract backend IDs"):
+        GitHubArtifactClient(github_token="gh_token")
 
 
-def test_init_raises_if_jwt_is_malformed():
+def test_init_raises_if_jwt_is_malformed(monkeypatch):
     """ClickException if the token is not a valid JWT."""
     env_vars = {
         "ACTIONS_RUNTIME_TOKEN": "not-a-jwt",
@@ -126,53 +153,90 @@ def test_init_raises_if_jwt_is_malformed():
         "GITHUB_RUN_ID": "12345",
         "GITHUB_REPOSITORY": "owner/repo",
     }
-    with patch.dict(os.environ, env_vars):
-        with pytest.raises(click.ClickException, match="Failed to extract backend IDs"):
-            GitHubArtifactClient(github_token="gh_token")
+    _set_env(monkeypatch, env_vars)
+    with pytest.raises(click.ClickException, match="Failed to extract backend IDs"):
+        GitHubArtifactClient(github_token="gh_token")
+
+
+def test_backend_ids_are_decoded_once_per_token(mock_env):
+    """Constructing several clients with the same token reuses the decoded IDs."""
+    _decode_backend_ids.cache_clear()
+
+    first = GitHubArtifactClient(github_token="gh_token")
+    second = GitHubArtifactClient(github_token="gh_token")
+
+    assert first.backend_ids == second.backend_ids
+    assert first.backend_ids is not second.backend_ids
+    assert _decode_backend_ids.cache_info().misses == 1
+    assert _decode_backend_ids.cache_info().hits == 1
+
+
+@pytest.mark.parametrize(
+    "scp",
+    [
+        "Actions.Results:run-id:job-id:extra",
+        "Actions.Results:run-id",
+        "Other.Actions.Results:run-id:job-id",
+    ],
+)
+def test_decode_backend_ids_rejects_malformed_results_scope(scp):
+    """Only a standalone Actions.Results scope with exactly two IDs is accepted."""
+    header = base64.urlsafe_b64encode(json.dumps({"alg": "none"}).encode()).rstrip(b"=").decode()
+    payload = base64.urlsafe_b64encode(json.dumps({"scp": scp}).encode()).rstrip(b"=").decode()
+
+    with pytest.raises(click.ClickException, match="No Actions.Results scope found"):
+        _decode_backend_ids(f"{header}.{payload}.sig")
 
 
 # ---------------------------------------------------------------------------
 # Upload artifact tests (full flow)
 # ---------------------------------------------------------------------------
 
+SIGNED_UPLOAD_URL = "https://blob.example.com/upload?sig=abc"
+
+
+# Class attributes plus the instance attributes set in Response.__init__
+RESPONSE_ATTRS = sorted({*dir(requests.Response), *requests.Response.__attrs__})
+
+
+def _response(**attrs):
+    """A mock limited to the attributes of a real requests.Response, so typos fail loudly."""
+    return Mock(spec_set=RESPONSE_ATTRS, **attrs)
+
+
+def _twirp_response(**body):
+    """A successful Twirp response carrying the given JSON body."""
+    resp = _response()
+    resp.status_code = 200
+    resp.json.return_value = body
+    return resp
+
+
 @patch("infra_visualiser_action.artifact.requests")
 def test_upload_artifact_success(mock_requests, mock_env, tmp_path):
     """Test the full v4 upload flow: CreateArtifact -> Blob PUT -> FinalizeArtifact."""
     client = GitHubArtifactClient(github_token="gh_token")
+    mock_session = mock_requests.Session.return_value
 
     file_path = tmp_path / "archive.tar.gz"
     file_path.write_bytes(b"terraform-archive-content")
 
-    # Mock CreateArtifact (Twirp POST)
-    mock_create_resp = MagicMock()
-    mock_create_resp.status_code = 200
-    mock_create_resp.json.return_value = {
-        "ok": True,
-        "signed_upload_url": "https://blob.example.com/upload?sig=abc",
-    }
-
-    # Mock FinalizeArtifact (Twirp POST)
-    mock_finalize_resp = MagicMock()
-    mock_finalize_resp.status_code = 200
-    mock_finalize_resp.json.return_value = {
-        "ok": True,
-        "artifact_id": "99887766",
-    }
+    # Mock CreateArtifact then FinalizeArtifact (Twirp POSTs, in call order)
+    mock_session.post.side_effect = [
+        _twirp_response(ok=True, signed_upload_url=SIGNED_UPLOAD_URL),
+        _twirp_response(ok=True, artifact_id="99887766"),
+    ]
 
-    # Route Twirp POSTs by URL
-    def post_side_effect(url, **kwargs):
-        if "CreateArtifact" in url:
-            return mock_create_resp
-        if "FinalizeArtifact" in url:
-            return mock_finalize_resp
-        return MagicMock(status_code=404)
+    # Mock Blob PUT, recording the body while its mapping is still open
+    mock_put_resp = _response()
+    mock_put_resp.ok = True
+    put_bodies = []
 
-    mock_requests.post.side_effect = post_side_effect
+    def put_side_effect(url, data, **kwargs):
+        put_bodies.append((type(data), bytes(data)))
+        return mock_put_resp
 
-    # Mock Blob PUT
-    mock_put_resp = MagicMock()
-    mock_put_resp.ok = True
-    mock_requests.put.return_value = mock_put_resp
+    mock_session.put.side_effect = put_side_effect
 
     # Execute
     url = client.upload_artifact("my-artifact", file_path)
@@ -181,24 +245,31 @@ def test_upload_artifact_success(mock_requests, mock_env, tmp_path):
     assert url == "https://api.github.com/repos/owner/repo/actions/artifacts/99887766/zip"
 
     # Verify Twirp calls
-    assert mock_requests.post.call_count == 2
-    create_call_args = mock_requests.post.call_args_list[0]
+    assert mock_session.post.call_count == 2
+    create_call_args = mock_session.post.call_args_list[0]
     assert "CreateArtifact" in create_call_args[0][0]
-    assert create_call_args[1]["json"]["name"] == "my-artifact"
-    assert create_call_args[1]["json"]["version"] == 4
-    assert create_call_args[1]["json"]["workflow_run_backend_id"] == FAKE_RUN_BACKEND_ID
-    assert create_call_args[1]["json"]["workflow_job_run_backend_id"] == FAKE_JOB_BACKEND_ID
+    create_body = json.loads(create_call_args[1]["data"])
+    assert create_body["name"] == "my-artifact"
+    assert create_body["version"] == 4
+    assert create_body["workflow_run_backend_id"] == FAKE_RUN_BACKEND_ID
+    assert create_body["workflow_job_run_backend_id"] == FAKE_JOB_BACKEND_ID
 
-    finalize_call_args = mock_requests.post.call_args_list[1]
+    finalize_call_args = mock_session.post.call_args_list[1]
     assert "FinalizeArtifact" in finalize_call_args[0][0]
-    assert finalize_call_args[1]["json"]["name"] == "my-artifact"
-    assert finalize_call_args[1]["json"]["size"] == str(len(b"terraform-archive-content"))
+    finalize_body = json.loads(finalize_call_args[1]["data"])
+    assert finalize_body["name"] == "my-artifact"
+    assert finalize_body["size"] == str(len(b"terraform-archive-content"))
+    assert finalize_body["hash"] == (
+        f"sha256:{hashlib.sha256(b'terraform-archive-content').hexdigest()}"
+    )
 
     # Verify blob upload
-    assert mock_requests.put.call_count == 1
-    put_call_args = mock_requests.put.call_args
-    assert put_call_args[0][0] == "https://blob.example.com/upload?sig=abc"
+    assert mock_session.put.call_count == 1
+    put_call_args = mock_session.put.call_args
+    assert put_call_args[0][0] == SIGNED_UPLOAD_URL
     assert put_call_args[1]["headers"]["x-ms-blob-type"] == "BlockBlob"
+    assert put_call_args[1]["headers"]["Content-Length"] == str(len(b"terraform-archive-content"))
+    assert put_bodies == [(memoryview, b"terraform-archive-content")]
 
 
 # ---------------------------------------------------------------------------
@@ -206,32 +277,31 @@ def test_upload_artifact_success(mock_requests, mock_env, tmp_path):
 # ---------------------------------------------------------------------------
 
 @patch("infra_visualiser_action.artifact.requests")
-def test_upload_artifact_create_fails(mock_requests, mock_env, tmp_path):
+def test_upload_artifact_create_fails(mock_requests, mock_env):
     """ClickException when CreateArtifact returns a non-retryable error."""
     client = GitHubArtifactClient(github_token="gh_token")
-    file_path = tmp_path / "test.tar.gz"
-    file_path.touch()
+    mock_session = mock_requests.Session.return_value
+    # CreateArtifact fails before the archive is ever opened
+    file_path = Path("/nonexistent/test.tar.gz")
 
-    mock_resp = MagicMock()
+    mock_resp = _response()
     mock_resp.status_code = 403
     mock_resp.text = "Forbidden"
-    mock_requests.post.return_value = mock_resp
+    mock_session.post.return_value = mock_resp
 
     with pytest.raises(click.ClickException, match="Twirp CreateArtifact failed: 403"):
         client.upload_artifact("test", file_path)
 
 
 @patch("infra_visualiser_action.artifact.requests")
-def test_upload_artifact_create_returns_not_ok(mock_requests, mock_env, tmp_path):
+def test_upload_artifact_create_returns_not_ok(mock_requests, mock_env):
     """ClickException when CreateArtifact response has ok=false."""
     client = GitHubArtifactClient(github_token="gh_token")
-    file_path = tmp_path / "test.tar.gz"
-    file_path.touch()
+    mock_session = mock_requests.Session.return_value
+    # CreateArtifact fails before the archive is ever opened
+    file_path = Path("/nonexistent/test.tar.gz")
 
-    mock_resp = MagicMock()
-    mock_resp.status_code = 200
-    mock_resp.json.return_value = {"ok": False}
-    mock_requests.post.return_value = mock_resp
+    mock_session.post.return_value = _twirp_response(ok=False)
 
     with pytest.raises(click.ClickException, match="CreateArtifact: response from backend was not ok"):
         client.upload_artifact("test", file_path)
@@ -241,24 +311,19 @@ def test_upload_artifact_create_returns_not_ok(mock_requests, mock_env, tmp_path
 def test_upload_artifact_blob_upload_fails(mock_requests, mock_env, tmp_path):
     """ClickException when the blob storage PUT fails."""
     client = GitHubArtifactClient(github_token="gh_token")
+    mock_session = mock_requests.Session.return_value
     file_path = tmp_path / "test.tar.gz"
     file_path.write_bytes(b"content")
 
     # CreateArtifact succeeds
-    mock_create = MagicMock()
-    mock_create.status_code = 200
-    mock_create.json.return_value = {
-        "ok": True,
-        "signed_upload_url": "https://blob.example.com/upload?sig=abc",
-    }
-    mock_requests.post.return_value = mock_create
+    mock_session.post.return_value = _twirp_response(ok=True, signed_upload_url=SIGNED_UPLOAD_URL)
 
     # Blob PUT fails
-    mock_put = MagicMock()
+    mock_put = _response()
     mock_put.ok = False
     mock_put.status_code = 403
     mock_put.text = "Forbidden"
-    mock_requests.put.return_value = mock_put
+    mock_session.put.return_value = mock_put
 
     with pytest.raises(click.ClickException, match="Failed to upload file to blob storage"):
         client.upload_artifact("test", file_path)
@@ -268,33 +333,18 @@ def test_upload_artifact_blob_upload_fails(mock_requests, mock_env, tmp_path):
 def test_upload_artifact_finalize_fails(mock_requests, mock_env, tmp_path):
     """ClickException when FinalizeArtifact returns not ok."""
     client = GitHubArtifactClient(github_token="gh_token")
+    mock_session = mock_requests.Session.return_value
     file_path = tmp_path / "test.tar.gz"
     file_path.write_bytes(b"content")
 
-    # CreateArtifact succeeds
-    mock_create = MagicMock()
-    mock_create.status_code = 200
-    mock_create.json.return_value = {
-        "ok": True,
-        "signed_upload_url": "https://blob.example.com/upload?sig=abc",
-    }
-
-    # FinalizeArtifact returns not ok
-    mock_finalize = MagicMock()
-    mock_finalize.status_code = 200
-    mock_finalize.json.return_value = {"ok": False}
-
-    def post_side_effect(url, **kwargs):
-        if "CreateArtifact" in url:
-            return mock_create
-        if "FinalizeArtifact" in url:
-            return mock_finalize
-        return MagicMock(status_code=404)
-
-    mock_requests.post.side_effect = post_side_effect
+    # CreateArtifact succeeds, FinalizeArtifact returns not ok
+    mock_session.post.side_effect = [
+        _twirp_response(ok=True, signed_upload_url=SIGNED_UPLOAD_URL),
+        _twirp_response(ok=False),
+    ]
 
     # Blob PUT succeeds
-    mock_requests.put.return_value = MagicMock(ok=True)
+    mock_session.put.return_value = _response(ok=True)
 
     with pytest.raises(click.ClickException, match="FinalizeArtifact: response from backend was not ok"):
         client.upload_artifact("test", file_path)
@@ -309,20 +359,21 @@ def test_upload_artifact_finalize_fails(mock_requests, mock_env, tmp_path):
 def test_twirp_retries_on_transient_error(mock_requests, mock_sleep, mock_env):
     """_twirp_request retries on 502/503/500 and succeeds on subsequent attempt."""
     client = GitHubArtifactClient(github_token="gh_token")
+    mock_session = mock_requests.Session.return_value
 
-    mock_fail = MagicMock()
+    mock_fail = _response()
     mock_fail.status_code = 502
     mock_fail.text = "Bad Gateway"
 
-    mock_success = MagicMock()
+    mock_success = _response()
     mock_success.status_code = 200
     mock_success.json.return_value = {"ok": True, "signed_upload_url": "https://blob.example.com"}
 
-    mock_requests.post.side_effect = [mock_fail, mock_fail, mock_success]
+    mock_session.post.side_effect = [mock_fail, mock_fail, mock_success]
 
     result = client._twirp_request("CreateArtifact", {"name": "test"})
     assert result == {"ok": True, "signed_upload_url": "https://blob.example.com"}
-    assert mock_requests.post.call_count == 3
+    assert mock_session.post.call_count == 3
     assert mock_sleep.call_count == 2
 
 
@@ -331,16 +382,50 @@ def test_twirp_retries_on_transient_error(mock_requests, mock_sleep, mock_env):
 def test_twirp_exhausts_retries(mock_requests, mock_sleep, mock_env):
     """_twirp_request raises after exhausting all retry attempts."""
     client = GitHubArtifactClient(github_token="gh_token")
+    mock_session = mock_requests.Session.return_value
 
-    mock_fail = MagicMock()
+    mock_fail = _response()
     mock_fail.status_code = 503
     mock_fail.text = "Service Unavailable"
-    mock_requests.post.return_value = mock_fail
+    mock_session.post.return_value = mock_fail
 
     with pytest.raises(click.ClickException, match="failed after 5 attempts"):
         client._twirp_request("CreateArtifact", {"name": "test"})
 
-    assert mock_requests.post.call_count == 5
+    assert mock_session.post.call_count == 5
+
+
+@pytest.mark.parametrize(
+    "retry_after, expected_wait",
+    [
+        ("7", 7.0),
+        # Absurd delays are capped rather than stalling the run
+        ("86400", MAX_RETRY_AFTER_S),
+        # Values time.sleep() cannot take fall back to the default backoff
+        ("nan", GitHubArtifactClient.BASE_RETRY_INTERVAL_S),
+        ("inf", GitHubArtifactClient.BASE_RETRY_INTERVAL_S),
+    ],
+)
+@patch("infra_visualiser_action.artifact.time.sleep")
+@patch("infra_visualiser_action.artifact.requests")
+def test_twirp_honours_retry_after_with_jitter(
+    mock_requests, mock_sleep, mock_env, retry_after, expected_wait
+):
+    """_twirp_request waits for the server's Retry-After (plus jitter) instead of the default backoff."""
+    client = GitHubArtifactClient(github_token="gh_token")
+    mock_session = mock_requests.Session.return_value
+
+    mock_throttled = _response(
+        status_code=429, text="Too Many Requests", headers={"Retry-After": retry_after}
+    )
+    mock_success = _response(status_code=200)
+    mock_success.json.return_value = {"ok": True}
+
+    mock_session.post.side_effect = [mock_throttled, mock_success]
+
+    assert client._twirp_request("CreateArtifact", {"name": "test"}) == {"ok": True}
+    wait = mock_sleep.call_args[0][0]
+    assert expected_wait <= wait <= expected_wait + GitHubArtifactClient.RETRY_JITTER_S
 
 
 # ---------------------------------------------------------------------------
@@ -359,22 +444,23 @@ def test_get_artifact_url_with_artifact_id(mock_env):
 def test_get_artifact_url_polls_rest_api(mock_requests, mock_sleep, mock_env):
     """When no artifact_id, polls the REST API and finds artifact by name."""
     client = GitHubArtifactClient(github_token="gh_token")
+    mock_session = mock_requests.Session.return_value
 
-    mock_get_empty = MagicMock(ok=True)
+    mock_get_empty = _response(ok=True)
     mock_get_empty.json.return_value = {"artifacts": []}
 
-    mock_get_success = MagicMock(ok=True)
+    mock_get_success = _response(ok=True)
     mock_get_success.json.return_value = {
         "artifacts": [
             {"name": "test", "archive_download_url": "https://final-url.com/zip"},
         ]
     }
 
-    mock_requests.get.side_effect = [mock_get_empty, mock_get_empty, mock_get_success]
+    mock_session.get.side_effect = [mock_get_empty, mock_get_empty, mock_get_success]
 
     url = client.get_artifact_url("test")
     assert url == "https://final-url.com/zip"
-    assert mock_requests.get.call_count == 3
+    assert mock_session.get.call_count == 3
     assert mock_sleep.call_count == 2
 
 
@@ -383,12 +469,52 @@ def test_get_artifact_url_polls_rest_api(mock_requests, mock_sleep, mock_env):
 def test_get_artifact_url_raises_after_polling_exhausted(mock_requests, mock_sleep, mock_env):
     """Raises ClickException if artifact URL cannot be determined after polling."""
     client = GitHubArtifactClient(github_token="gh_token")
+    mock_session = mock_requests.Session.return_value
 
-    mock_get_empty = MagicMock(ok=True)
+    mock_get_empty = _response(ok=True)
     mock_get_empty.json.return_value = {"artifacts": []}
-    mock_requests.get.return_value = mock_get_empty
+    mock_session.get.return_value = mock_get_empty
 
     with pytest.raises(click.ClickException, match="Could not determine artifact download URL"):
         client.get_artifact_url("nonexistent-artifact")
 
-    assert mock_requests.get.call_count == 5
+    assert mock_session.get.call_count == GitHubArtifactClient.MAX_POLL_ATTEMPTS
+    # Slow finalization gets as long to show up as with the old fixed 2s polling
+    assert sum(c.args[0] for c in mock_sleep.call_args_list) >= 7.5
+
+
+@patch("infra_visualiser_action.artifact.time.sleep")
+@patch("infra_visualiser_action.artifact.requests")
+def test_get_artifact_url_sends_etag_and_skips_unchanged_listing(mock_requests, mock_sleep, mock_env):
+    """Subsequent polls send If-None-Match and a 304 response is treated as 'not yet listed'."""
+    client = GitHubArtifactClient(github_token="gh_token")
+    mock_session = mock_requests.Session.return_value
+
+    mock_get_empty = _response(ok=True, status_code=200, headers={"ETag": '"abc"'})
+    mock_get_empty.json.return_value = {"artifacts": []}
+
+    mock_not_modified = _response(ok=True, status_code=304)
+
+    mock_get_success = _response(ok=True, status_code=200, headers={"ETag": '"def"'})
+    mock_get_success.json.return_value = {
+        "artifacts": [
+            {"name": "test", "archive_download_url": "https://final-url.com/zip"},
+        ]
+    }
+
+    sent_headers = []
+
+    def get_side_effect(url, headers):
+        sent_headers.append(dict(headers))
+        return responses.pop(0)
+
+    responses = [mock_get_empty, mock_not_modified, mock_get_success]
+    mock_session.get.side_effect = get_side_effect
+
+    url = client.get_artifact_url("test")
+    assert url == "https://final-url.com/zip"
+    assert "If-None-Match" not in sent_headers[0]
+    assert sent_headers[1]["If-None-Match"] == '"abc"'
+    assert sent_headers[2]["If-None-Match"] == '"abc"'
+    mock_not_modified.json.assert_not_called()
+    assert [c.args[0] for c in mock_sleep.call_args_list] == [0.25, 0.5]
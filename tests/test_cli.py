@@ -0,0 +1,110 @@
+import importlib.machinery
+import importlib.util
+from pathlib import Path
+from unittest import mock
+
+import pytest
+from click.testing import CliRunner
+
+import infra_visualiser_action
+from infra_visualiser_action import tf
+
+
+def _load_cli():
+    """The action's entry point is a script without a .py suffix, so load it by path."""
+    path = Path(infra_visualiser_action.__file__).parent / "cli"
+    loader = importlib.machinery.SourceFileLoader(
+        "infra_visualiser_action_cli", str(path)
+    )
+    spec = importlib.util.spec_from_loader(loader.name, loader)
+    module = importlib.util.module_from_spec(spec)
+    loader.exec_module(module)
+    return module
+
+
+cli = _load_cli()
+
+
+@pytest.fixture
+def recipe_env(tmp_path: Path, monkeypatch) -> Path:
+    """A workspace with a recipe whose plan succeeds and which has Terraform changes."""
+    (tmp_path / "recipe").mkdir()
+    monkeypatch.setenv("GITHUB_WORKSPACE", str(tmp_path))
+    monkeypatch.setattr(cli, "mark_dir_safe", mock.Mock())
+    monkeypatch.setattr(
+        cli, "has_terraform_changes_in_paths", mock.Mock(return_value=True)
+    )
+    monkeypatch.setattr(cli, "find_tfvars_files", mock.Mock(return_value=[]))
+    monkeypatch.setattr(
+        cli,
+        "run_plans",
+        mock.Mock(
+            return_value=(
+                [
+                    tf.PlanAttempt(
+                        env_label="defaults", var_file=None, success=True, log_path=None
+                    )
+                ],
+                True,
+            )
+        ),
+    )
+    monkeypatch.setattr(
+        cli, "find_local_modules_from_modules_json", mock.Mock(return_value=set())
+    )
+    monkeypatch.setattr(cli, "create_archive", mock.Mock())
+    return tmp_path
+
+
+def test_missing_oidc_env_fails_before_artifact_upload(recipe_env: Path, monkeypatch):
+    """Without the id-token permission no artifact may be left behind"""
+    monkeypatch.delenv("ACTIONS_ID_TOKEN_REQUEST_URL", raising=False)
+    monkeypatch.delenv("ACTIONS_ID_TOKEN_REQUEST_TOKEN", raising=False)
+    artifact_client = mock.Mock()
+    monkeypatch.setattr(cli, "GitHubArtifactClient", artifact_client)
+
+    result = CliRunner().invoke(
+        cli.main,
+        [
+            "--directory",
+            "recipe",
+            "--recipe-nickname",
+            "nick",
+            "--host",
+            "https://grafos.ai",
+            "--upload-to-github",
+            "--github-token",
+            "token",
+        ],
+    )
+
+    assert result.exit_code == 1
+    assert "ACTIONS_ID_TOKEN_REQUEST_URL" in result.output
+    artifact_client.assert_not_called()
+
+
+def test_skips_plans_without_terraform_changes(recipe_env: Path, monkeypatch):
+    """Changes that touch no Terraform files exit cleanly before init or plan"""
+    monkeypatch.setattr(
+        cli, "has_terraform_changes_in_paths", mock.Mock(return_value=False)
+    )
+    run_init = mock.Mock()
+    monkeypatch.setattr(tf, "_run_init", run_init)
+
+    result = CliRunner().invoke(
+        cli.main,
+        [
+            "--directory",
+            "recipe",
+            "--recipe-nickname",
+            "nick",
+            "--host",
+            "https://grafos.ai",
+        ],
+    )
+
+    assert result.exit_code == 0
+    assert "Skipping plans" in result.output
+    cli.run_plans.assert_not_called()
+    run_init.assert_not_called()
+    cli.create_archive.assert_not_called()
@@ -1,9 +1,45 @@
 import tarfile
 from pathlib import Path
+from unittest import mock
+
+import pytest
 
 from infra_visualiser_action import client
 
 
+def _archive_names(archive_path: Path) -> set[str]:
+    """Member names of a gzipped tar, read in a single streaming pass."""
+    with tarfile.open(archive_path, "r|gz") as tar:
+        return {member.name for member in tar}
+
+
+@pytest.fixture
+def store_only_archives(monkeypatch):
+    """
+    For tests that only check which members an archive holds: skip deflate
+    work. Level 0 still writes (and reads back through) a valid gzip stream.
+    pigz is hidden so the result doesn't depend on what the host has installed.
+    """
+    monkeypatch.setattr(client, "ARCHIVE_COMPRESSLEVEL", 0)
+    monkeypatch.setattr(client.shutil, "which", lambda name: None)
+
+
+@pytest.fixture
+def repo_root(tmp_path: Path) -> Path:
+    repo_root = tmp_path / "repo"
+    repo_root.mkdir()
+    return repo_root
+
+
+@pytest.fixture
+def recipe_dir(repo_root: Path) -> Path:
+    recipe_dir = repo_root / "recipe"
+    recipe_dir.mkdir()
+    (recipe_dir / "main.tf").write_text("content")
+    return recipe_dir
+
+
+@pytest.mark.usefixtures("store_only_archives")
 def test_create_archive_includes_matching_files_from_recipe_dir(tmp_path: Path):
     """Test that create_archive includes *.tf, *.json, *.dot files from recipe_dir"""
     repo_root = tmp_path / "repo"
@@ -33,8 +69,7 @@ def test_create_archive_includes_matching_files_from_recipe_dir(tmp_path: Path):
     assert archive_path.exists()
     
     # Verify archive contents
-    with tarfile.open(archive_path, "r:gz") as tar:
-        members = set([member.name for member in tar.getmembers()])
+    members = _archive_names(archive_path)
     
     expected_files = set([
         "recipe/nested/main.tf",
@@ -46,6 +81,7 @@ def test_create_archive_includes_matching_files_from_recipe_dir(tmp_path: Path):
     assert "recipe/nested/README.md" not in members
 
 
+@pytest.mark.usefixtures("store_only_archives")
 def test_create_archive_includes_markdown_when_enabled(tmp_path: Path):
     """When include_markdown=True, *.md files at the repository root are included in the archive."""
     repo_root = tmp_path / "repo"
@@ -68,21 +104,15 @@ def test_create_archive_includes_markdown_when_enabled(tmp_path: Path):
     )
     
     assert archive_path.exists()
-    with tarfile.open(archive_path, "r:gz") as tar:
-        members = set([member.name for member in tar.getmembers()])
+    members = _archive_names(archive_path)
     
     expected = {"recipe/nested/main.tf", "README.md", "docs.md"}
     assert members == expected
 
 
-def test_create_archive_include_markdown_adds_markdown_from_repo_root_and_subdirs(tmp_path: Path):
+@pytest.mark.usefixtures("store_only_archives")
+def test_create_archive_include_markdown_adds_markdown_from_repo_root_and_subdirs(tmp_path: Path, repo_root: Path, recipe_dir: Path):
     """With include_markdown=True, only *.md at the repository root are added; .md in subdirs are not."""
-    repo_root = tmp_path / "repo"
-    repo_root.mkdir()
-    
-    recipe_dir = repo_root / "recipe"
-    recipe_dir.mkdir()
-    (recipe_dir / "main.tf").write_text("content")
     (recipe_dir / "README.md").write_text("readme in recipe")
     
     (repo_root / "ROOT.md").write_text("root readme")
@@ -102,8 +132,7 @@ def test_create_archive_include_markdown_adds_markdown_from_repo_root_and_subdir
         include_markdown=True,
     )
     
-    with tarfile.open(archive_path, "r:gz") as tar:
-        members = set([member.name for member in tar.getmembers()])
+    members = _archive_names(archive_path)
     
     assert "recipe/main.tf" in members
     assert "modules/local/main.tf" in members
@@ -112,13 +141,9 @@ def test_create_archive_include_markdown_adds_markdown_from_repo_root_and_subdir
     assert "modules/local/NOTES.md" in members
 
 
-def test_create_archive_include_markdown_skips_vendor_dirs(tmp_path: Path):
+@pytest.mark.usefixtures("store_only_archives")
+def test_create_archive_include_markdown_skips_vendor_dirs(tmp_path: Path, repo_root: Path, recipe_dir: Path):
     """With include_markdown=True, *.md under vendor/node_modules/etc. are excluded."""
-    repo_root = tmp_path / "repo"
-    repo_root.mkdir()
-    recipe_dir = repo_root / "recipe"
-    recipe_dir.mkdir()
-    (recipe_dir / "main.tf").write_text("content")
     (recipe_dir / "README.md").write_text("recipe readme")
 
     (repo_root / "vendor" / "pkg" / "README.md").parent.mkdir(parents=True)
@@ -133,8 +158,7 @@ def test_create_archive_include_markdown_skips_vendor_dirs(tmp_path: Path):
         archive_path=archive_path,
         include_markdown=True,
     )
-    with tarfile.open(archive_path, "r:gz") as tar:
-        members = set([member.name for member in tar.getmembers()])
+    members = _archive_names(archive_path)
 
     assert "recipe/main.tf" in members
     assert "recipe/README.md" in members
@@ -142,99 +166,226 @@ def test_create_archive_include_markdown_skips_vendor_dirs(tmp_path: Path):
     assert "node_modules/some-pkg/CHANGELOG.md" not in members
 
 
-def test_create_archive_includes_extra_paths_as_files(tmp_path: Path):
-    """Test that extra_paths files are included in archive"""
-    repo_root = tmp_path / "repo"
-    repo_root.mkdir()
-    
+@pytest.mark.usefixtures("store_only_archives")
+def test_create_archive_include_markdown_only_prunes_vendor_dirs_below_repo_root(tmp_path: Path):
+    """Vendor-named directories above the repository root do not exclude its markdown."""
+    repo_root = tmp_path / "vendor" / "repo"
+    repo_root.mkdir(parents=True)
     recipe_dir = repo_root / "recipe"
     recipe_dir.mkdir()
     (recipe_dir / "main.tf").write_text("content")
-    
-    extra_file = repo_root / "extra" / "file.json"
-    extra_file.parent.mkdir()
-    extra_file.write_text('{"extra": "data"}')
-    
+    (repo_root / "README.md").write_text("root readme")
+    (repo_root / ".terraform" / "modules").mkdir(parents=True)
+    (repo_root / ".terraform" / "modules" / "README.md").write_text("cached module readme")
+
     archive_path = tmp_path / "output" / "archive.tar.gz"
-    
     client.create_archive(
         repo_root=repo_root,
         recipe_dir=recipe_dir,
         archive_path=archive_path,
-        extra_paths=[extra_file],
+        include_markdown=True,
     )
-    
-    with tarfile.open(archive_path, "r:gz") as tar:
-        members =   set([member.name for member in tar.getmembers()])
-    
-    assert set(["recipe/main.tf", "extra/file.json"]) == set(members)
+    members = _archive_names(archive_path)
 
+    assert members == {"recipe/main.tf", "README.md"}
+
+
+@pytest.mark.usefixtures("store_only_archives")
+@pytest.mark.parametrize(
+    "files, extra_paths, expected",
+    [
+        # A plain file passed as an extra path is added as-is
+        (["extra/file.json"], ["extra/file.json"], {"recipe/main.tf", "extra/file.json"}),
+        # Extra paths that do not exist are skipped
+        (
+            ["existing.tf"],
+            ["nonexistent/file.tf", "existing.tf"],
+            {"recipe/main.tf", "existing.tf"},
+        ),
+        # Directories contribute their own *.tf files, but not subdirectories or other suffixes
+        (
+            [
+                "modules/local-module/main.tf",
+                "modules/local-module/variables.tf",
+                "modules/local-module/nested/sub.tf",
+                "modules/local-module/README.md",
+            ],
+            ["modules/local-module"],
+            {
+                "recipe/main.tf",
+                "modules/local-module/main.tf",
+                "modules/local-module/variables.tf",
+            },
+        ),
+    ],
+)
+def test_create_archive_includes_extra_paths(
+    tmp_path: Path,
+    repo_root: Path,
+    recipe_dir: Path,
+    files: list[str],
+    extra_paths: list[str],
+    expected: set[str],
+):
+    """Test that extra_paths files and directories are added to the archive"""
+    for rel in files:
+        (repo_root / rel).parent.mkdir(parents=True, exist_ok=True)
+        (repo_root / rel).write_text("content")
 
-def test_create_archive_only_includes_files_in_extra_paths_directories(tmp_path: Path):
-    """Test that extra_paths directories include *.tf files but exclude subdirectories"""
-    repo_root = tmp_path / "repo"
-    repo_root.mkdir()
-    
-    recipe_dir = repo_root / "recipe"
-    recipe_dir.mkdir()
-    (recipe_dir / "main.tf").write_text("content")
-    
-    # Create extra directory with nested .tf files
-    extra_dir = repo_root / "modules" / "local-module"
-    extra_dir.mkdir(parents=True)
-    (extra_dir / "main.tf").write_text("module content")
-    (extra_dir / "variables.tf").write_text("module vars")
-    (extra_dir / "nested").mkdir()
-    (extra_dir / "nested" / "sub.tf").write_text("nested content")
-    
-    # Non-matching file in extra_dir (should not be included)
-    (extra_dir / "README.md").write_text("readme")
-    
     archive_path = tmp_path / "output" / "archive.tar.gz"
-    
+
     client.create_archive(
         repo_root=repo_root,
         recipe_dir=recipe_dir,
         archive_path=archive_path,
-        extra_paths=[extra_dir],
+        extra_paths=[repo_root / rel for rel in extra_paths],
     )
-    
-    with tarfile.open(archive_path, "r:gz") as tar:
-        members = set([member.name for member in tar.getmembers()])
-    
-    expected_files = {
-        "recipe/main.tf",
-        "modules/local-module/main.tf",
-        "modules/local-module/variables.tf",
-    }
-    
-    assert members == expected_files
-    assert "modules/local-module/nested/sub.tf" not in members
 
+    assert _archive_names(archive_path) == expected
 
-def test_create_archive_skips_nonexistent_extra_paths(tmp_path: Path):
-    """Test that non-existent extra_paths are skipped"""
+
+def test_create_archive_preserves_file_content_and_metadata(tmp_path: Path):
+    """Archived members carry the original bytes, size, mode and mtime"""
     repo_root = tmp_path / "repo"
     repo_root.mkdir()
-    
+
     recipe_dir = repo_root / "recipe"
     recipe_dir.mkdir()
-    (recipe_dir / "main.tf").write_text("content")
-    
-    nonexistent = repo_root / "nonexistent" / "file.tf"
-    existing = repo_root / "existing.tf"
-    existing.write_text("existing content")
-    
+    main_tf = recipe_dir / "main.tf"
+    main_tf.write_text('resource "null_resource" "x" {}')
+    main_tf.chmod(0o640)
+
     archive_path = tmp_path / "output" / "archive.tar.gz"
-    
+
     client.create_archive(
         repo_root=repo_root,
         recipe_dir=recipe_dir,
         archive_path=archive_path,
-        extra_paths=[nonexistent, existing],
     )
-    
+
     with tarfile.open(archive_path, "r:gz") as tar:
-        members = set([member.name for member in tar.getmembers()])
-    
-    assert set(["recipe/main.tf", "existing.tf"]) == members
+        member = tar.getmember("recipe/main.tf")
+        content = tar.extractfile(member).read()
+
+    assert content == main_tf.read_bytes()
+    assert member.isfile()
+    assert member.size == main_tf.stat().st_size
+    assert member.mode == 0o640
+    assert member.mtime == int(main_tf.stat().st_mtime)
+
+
+def test_create_archive_pipes_through_pigz_when_available(tmp_path: Path, repo_root: Path, recipe_dir: Path, monkeypatch):
+    """When pigz is on PATH, the tar stream is compressed by the external process"""
+    # Stand-in for pigz that records its flags and gzips stdin to stdout
+    fake_pigz = tmp_path / "pigz"
+    pigz_args = tmp_path / "pigz-args"
+    fake_pigz.write_text(f'#!/bin/sh\necho "$@" > {pigz_args}\nexec gzip -c\n')
+    fake_pigz.chmod(0o755)
+    monkeypatch.setattr(client.shutil, "which", lambda name: str(fake_pigz))
+
+    archive_path = tmp_path / "output" / "archive.tar.gz"
+
+    client.create_archive(
+        repo_root=repo_root,
+        recipe_dir=recipe_dir,
+        archive_path=archive_path,
+    )
+
+    members = _archive_names(archive_path)
+
+    assert members == {"recipe/main.tf"}
+    assert pigz_args.read_text().split()[0] == "-1"
+
+
+def test_create_archive_falls_back_to_tarfile_at_fastest_level(
+    tmp_path: Path, repo_root: Path, recipe_dir: Path, monkeypatch
+):
+    """Without pigz, tarfile compresses the archive at ARCHIVE_COMPRESSLEVEL"""
+    monkeypatch.setattr(client.shutil, "which", lambda name: None)
+    archive_path = tmp_path / "output" / "archive.tar.gz"
+
+    with mock.patch.object(client.tarfile, "open", wraps=tarfile.open) as tar_open:
+        client.create_archive(
+            repo_root=repo_root,
+            recipe_dir=recipe_dir,
+            archive_path=archive_path,
+        )
+
+    assert tar_open.call_args.args[1] == "w:gz"
+    assert tar_open.call_args.kwargs["compresslevel"] == 1
+    assert _archive_names(archive_path) == {"recipe/main.tf"}
+
+
+@pytest.mark.parametrize(
+    "host, expected_url",
+    [
+        ("https://grafos.ai", "https://grafos.ai/api/v1/notify-terraform-recipe"),
+        ("https://grafos.ai/", "https://grafos.ai/api/v1/notify-terraform-recipe"),
+        ("https://smee.io/abc123", "https://smee.io/abc123"),
+        ("https://smee.io", "https://smee.io"),
+        ("https://SMEE.io/abc123", "https://SMEE.io/abc123"),
+        ("https://smee.io:443/abc123", "https://smee.io:443/abc123"),
+        # The notify path replaces any base path the host carries
+        ("https://grafos.ai/base/", "https://grafos.ai/api/v1/notify-terraform-recipe"),
+        ("https://grafos.ai?q=1", "https://grafos.ai/api/v1/notify-terraform-recipe?q=1"),
+    ],
+)
+def test_notify_server_posts_to_notify_endpoint(host: str, expected_url: str):
+    """notify_server appends the notify path unless the host is a smee.io channel"""
+    with (
+        mock.patch(
+            "infra_visualiser_action.client.get_commit_timestamp",
+            return_value="2024-01-01T00:00:00",
+        ),
+        mock.patch("infra_visualiser_action.client.requests.post") as mock_post,
+    ):
+        mock_post.return_value.ok = True
+        client.notify_server(
+            host=host,
+            oidc_token="token",
+            recipe_path="recipe",
+            recipe_nickname="nick",
+            artifact_url="https://example.com/artifact.zip",
+        )
+
+    assert mock_post.call_args[0][0] == expected_url
+    assert mock_post.call_args[1]["json"]["archive_url"] == "https://example.com/artifact.zip"
+
+
+@pytest.mark.parametrize("content", [b"archive-bytes", b""], ids=["archive", "empty"])
+def test_upload_archive_to_host_sends_archive_bytes(tmp_path: Path, content: bytes):
+    """upload_archive_to_host posts the archive content as the multipart file field"""
+    archive_path = tmp_path / "archive.tar.gz"
+    archive_path.write_bytes(content)
+
+    sent = {}
+
+    def post_side_effect(url, headers, files, data, timeout):
+        name, payload, content_type = files["file"]
+        sent.update(url=url, name=name, payload=bytes(payload), content_type=content_type)
+        return mock.Mock(ok=True)
+
+    with (
+        mock.patch(
+            "infra_visualiser_action.client.get_commit_timestamp",
+            return_value="2024-01-01T00:00:00",
+        ),
+        mock.patch(
+            "infra_visualiser_action.client.requests.post",
+            side_effect=post_side_effect,
+        ),
+    ):
+        client.upload_archive_to_host(
+            host="https://grafos.ai/",
+            archive_path=archive_path,
+            oidc_token="token",
+            recipe_path="recipe",
+            recipe_nickname="nick",
+        )
+
+    assert sent == {
+        "url": "https://grafos.ai/api/v1/upload-terraform-recipe",
+        "name": "archive.tar.gz",
+        "payload": content,
+        "content_type": "application/gzip",
+    }
@@ -1,45 +1,57 @@
-import os
-
 from pathlib import Path
 from unittest import mock
 
+import pytest
+
 from infra_visualiser_action import git
 
 
-def test_has_terraform_changes_in_paths_returns_false_when_no_terraform_files_changed(tmp_path: Path):
+@pytest.fixture(autouse=True)
+def clear_commit_timestamp_cache():
+    """Keeps cached timestamps from leaking into or out of any test."""
+    git._commit_timestamp.cache_clear()
+    yield
+    git._commit_timestamp.cache_clear()
+
+
+@pytest.fixture
+def mock_git(monkeypatch) -> mock.Mock:
+    """
+    Runs each test inside a GitHub Actions-like environment with git's
+    check_output replaced by a Mock; tests set its return value or side effect.
+    """
+    monkeypatch.setenv("GITHUB_SHA", "abc123")
+    monkeypatch.setenv(
+        "GITHUB_WORKFLOW_REF",
+        "octocat/hello-world/.github/workflows/my-workflow.yml@refs/heads/my_branch",
+    )
+    check_output = mock.Mock()
+    monkeypatch.setattr(git.subprocess, "check_output", check_output)
+    return check_output
+
+
+def test_has_terraform_changes_in_paths_returns_false_when_no_terraform_files_changed(tmp_path: Path, mock_git: mock.Mock):
     """Test that function returns False when diff contains no Terraform files"""
     repo_root = tmp_path.resolve()
     candidate_dirs = [tmp_path / "terraform" / "app", tmp_path / "terraform" / "network"]
     
     # Mock git diff output with non-terraform files
-    git_diff_output = "src/main.py\nREADME.md\nconfig.yaml\n"
-    
-    with (
-        mock.patch.dict(
-            os.environ,
-            {
-                "GITHUB_SHA": "abc123",
-                "GITHUB_WORKFLOW_REF": "octocat/hello-world/.github/workflows/my-workflow.yml@refs/heads/my_branch",
-            },
-            clear=False
-        ),
-        mock.patch(
-            "infra_visualiser_action.git.subprocess.check_output",
-            return_value=git_diff_output,
-        ) as mock_check_output,
-    ):
-        result = git.has_terraform_changes_in_paths(candidate_dirs, repo_root)
+    git_diff_output = "src/main.py\0README.md\0config.yaml\0"
     
+    mock_git.return_value = git_diff_output
+    result = git.has_terraform_changes_in_paths(candidate_dirs, repo_root)
+
     assert not result
     # Verify git diff was called with correct arguments
-    mock_check_output.assert_called_once()
-    call_args = mock_check_output.call_args[0][0]  # First positional arg is the command list
+    mock_git.assert_called_once()
+    call_args = mock_git.call_args[0][0]  # First positional arg is the command list
     assert call_args[0] == "git"
     assert "diff" in call_args
     assert "--name-only" in call_args
+    assert "-z" in call_args
 
 
-def test_has_terraform_changes_in_paths_returns_false_when_terraform_changes_not_in_candidate_dirs(tmp_path: Path):
+def test_has_terraform_changes_in_paths_returns_false_when_terraform_changes_not_in_candidate_dirs(tmp_path: Path, mock_git: mock.Mock):
     """Test that function returns False when Terraform files changed but not in candidate directories"""
     repo_root = tmp_path.resolve()
     
@@ -47,29 +59,16 @@ def test_has_terraform_changes_in_paths_returns_false_when_terraform_changes_not
     candidate_dirs = [tmp_path / "terraform" / "app", tmp_path / "terraform" / "network"]
     
     # Mock git diff output with Terraform files in different directories
-    git_diff_output = "other-terraform/module1/main.tf\nother-terraform/module2/variables.tfvars\n"
-
-    with (
-        mock.patch.dict(
-            os.environ,
-            {
-                "GITHUB_SHA": "abc123",
-                "GITHUB_WORKFLOW_REF": "octocat/hello-world/.github/workflows/my-workflow.yml@refs/heads/my_branch",
-            },
-            clear=False
-        ),
-        mock.patch(
-            "infra_visualiser_action.git.subprocess.check_output",
-            return_value=git_diff_output,
-        ) as mock_check_output,
-    ):
-        result = git.has_terraform_changes_in_paths(candidate_dirs, repo_root)
+    git_diff_output = "other-terraform/module1/main.tf\0other-terraform/module2/variables.tfvars\0"
+
+    mock_git.return_value = git_diff_output
+    result = git.has_terraform_changes_in_paths(candidate_dirs, repo_root)
 
     assert not result
-    mock_check_output.assert_called_once()
+    mock_git.assert_called_once()
 
 
-def test_has_terraform_changes_in_relevant_paths_returns_true(tmp_path: Path):
+def test_has_terraform_changes_in_relevant_paths_returns_true(tmp_path: Path, mock_git: mock.Mock):
     """Test that function returns True when Terraform files changed in candidate directories"""
     repo_root = tmp_path.resolve()
 
@@ -81,29 +80,16 @@ def test_has_terraform_changes_in_relevant_paths_returns_true(tmp_path: Path):
     ]
 
     # Mock git diff output with Terraform files in different directories
-    git_diff_output = "terraform/module1/main.tf\nother-terraform/module2/variables.tfvars\n"
-
-    with (
-        mock.patch.dict(
-            os.environ,
-            {
-                "GITHUB_SHA": "abc123",
-                "GITHUB_WORKFLOW_REF": "octocat/hello-world/.github/workflows/my-workflow.yml@refs/heads/my_branch",
-            },
-            clear=False
-        ),
-        mock.patch(
-            "infra_visualiser_action.git.subprocess.check_output",
-            return_value=git_diff_output,
-        ) as mock_check_output,
-    ):
-        result = git.has_terraform_changes_in_paths(candidate_dirs, repo_root)
+    git_diff_output = "terraform/module1/main.tf\0other-terraform/module2/variables.tfvars\0"
+
+    mock_git.return_value = git_diff_output
+    result = git.has_terraform_changes_in_paths(candidate_dirs, repo_root)
 
     assert result
-    mock_check_output.assert_called_once()
+    mock_git.assert_called_once()
 
 
-def test_has_no_terraform_changes_but_workflow_changed(tmp_path: Path):
+def test_has_no_terraform_changes_but_workflow_changed(tmp_path: Path, mock_git: mock.Mock):
     """Test that function returns True when Terraform files changed in candidate directories"""
     repo_root = tmp_path.resolve()
 
@@ -115,39 +101,26 @@ def test_has_no_terraform_changes_but_workflow_changed(tmp_path: Path):
     ]
 
     # Mock git diff output with Terraform files in different directories
-    git_diff_output = "other-terraform/module1/main.tf\nother-terraform/module2/variables.tfvars\n.github/workflows/my-workflow.yml\n"
+    git_diff_output = "other-terraform/module1/main.tf\0other-terraform/module2/variables.tfvars\0.github/workflows/my-workflow.yml\0"
 
     def mock_exists(self: Path) -> bool:
         """Mock Path.exists() to return True only for the workflow path"""
         return str(self) == ".github/workflows/my-workflow.yml"
 
-    with (
-        mock.patch.dict(
-            os.environ,
-            {
-                "GITHUB_SHA": "abc123",
-                "GITHUB_WORKFLOW_REF": "octocat/hello-world/.github/workflows/my-workflow.yml@refs/heads/my_branch",
-            },
-            clear=False
-        ),
-        mock.patch(
-            "infra_visualiser_action.git.subprocess.check_output",
-            return_value=git_diff_output,
-        ) as mock_check_output,
-        mock.patch.object(
-            Path,
-            "exists",
-            side_effect=mock_exists,
-            autospec=True,
-        ),
+    mock_git.return_value = git_diff_output
+    with mock.patch.object(
+        Path,
+        "exists",
+        side_effect=mock_exists,
+        autospec=True,
     ):
         result = git.has_terraform_changes_in_paths(candidate_dirs, repo_root)
 
     assert result
-    mock_check_output.assert_called_once()
+    mock_git.assert_called_once()
 
 
-def test_has_terraform_changes_in_paths_returns_true_when_recipe_dir_has_changes(tmp_path: Path):
+def test_has_terraform_changes_in_paths_returns_true_when_recipe_dir_has_changes(tmp_path: Path, mock_git: mock.Mock):
     """Test that function returns True when recipe directory has Terraform file changes"""
     repo_root = tmp_path.resolve()
 
@@ -156,23 +129,60 @@ def test_has_terraform_changes_in_paths_returns_true_when_recipe_dir_has_changes
     candidate_dirs = [recipe_dir]
 
     # Mock git diff output with Terraform file in recipe directory
-    git_diff_output = "terraform/my-recipe/main.tf\n"
-
-    with (
-        mock.patch.dict(
-            os.environ,
-            {
-                "GITHUB_SHA": "abc123",
-                "GITHUB_WORKFLOW_REF": "octocat/hello-world/.github/workflows/my-workflow.yml@refs/heads/my_branch",
-            },
-            clear=False
-        ),
-        mock.patch(
-            "infra_visualiser_action.git.subprocess.check_output",
-            return_value=git_diff_output,
-        ) as mock_check_output,
-    ):
-        result = git.has_terraform_changes_in_paths(candidate_dirs, repo_root)
+    git_diff_output = "terraform/my-recipe/main.tf\0"
+
+    mock_git.return_value = git_diff_output
+    result = git.has_terraform_changes_in_paths(candidate_dirs, repo_root)
 
     assert result
-    mock_check_output.assert_called_once()
+    mock_git.assert_called_once()
+
+
+def test_has_terraform_changes_in_paths_returns_true_for_nested_changes(tmp_path: Path, mock_git: mock.Mock):
+    """Test that Terraform changes in a subdirectory of a candidate directory are detected"""
+    repo_root = tmp_path.resolve()
+
+    candidate_dirs = [Path("terraform") / "my-recipe"]
+
+    git_diff_output = "terraform/my-recipe-other/main.tf\0terraform/my-recipe/modules/network/main.tf\0"
+
+    mock_git.return_value = git_diff_output
+    assert git.has_terraform_changes_in_paths(candidate_dirs, repo_root)
+
+    # Changes above a candidate directory do not count as changes inside it
+    assert not git.has_terraform_changes_in_paths(
+        [Path("terraform") / "my-recipe-other" / "nested"], repo_root
+    )
+
+
+def test_get_commit_timestamp_formats_commit_time_as_utc(mock_git: mock.Mock):
+    """Test that the raw %ct bytes from git are formatted as a UTC timestamp"""
+    mock_git.return_value = b"1700000000\n"
+    result = git.get_commit_timestamp()
+
+    assert result == "2023-11-14T22:13:20"
+    call_args = mock_git.call_args[0][0]
+    assert call_args[-4:] == ["log", "-1", "--format=%ct", "abc123"]
+
+
+def test_get_commit_timestamp_runs_git_once_per_sha(mock_git: mock.Mock, monkeypatch):
+    """Test that repeated lookups for the same commit reuse the first answer"""
+    mock_git.side_effect = [b"1700000000\n", b"1700000060\n"]
+    assert git.get_commit_timestamp() == "2023-11-14T22:13:20"
+    assert git.get_commit_timestamp() == "2023-11-14T22:13:20"
+    assert mock_git.call_count == 1
+
+    monkeypatch.setenv("GITHUB_SHA", "def456")
+    assert git.get_commit_timestamp() == "2023-11-14T22:14:20"
+    assert mock_git.call_count == 2
+
+
+def test_has_terraform_changes_in_paths_repo_root_candidate_matches_any_change(tmp_path: Path, mock_git: mock.Mock):
+    """Test that the repository root as a candidate matches Terraform changes anywhere"""
+    repo_root = tmp_path.resolve()
+
+    mock_git.return_value = "docs/README.md\0"
+    assert not git.has_terraform_changes_in_paths([Path(".")], repo_root)
+
+    mock_git.return_value = "docs/README.md\0modules/network/main.tf\0"
+    assert git.has_terraform_changes_in_paths([Path(".")], repo_root)
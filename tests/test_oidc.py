@@ -0,0 +1,103 @@
+import base64
+import json
+import time
+
+from unittest import mock
+
+import click
+import pytest
+
+from infra_visualiser_action import oidc
+
+
+@pytest.fixture
+def mock_token_request(monkeypatch) -> mock.Mock:
+    """
+    Runs each test inside a GitHub Actions-like environment with an empty
+    token cache; the token endpoint is replaced by a Mock of _SESSION.get.
+    """
+    monkeypatch.setenv("ACTIONS_ID_TOKEN_REQUEST_URL", "https://token.example.com/id")
+    monkeypatch.setenv("ACTIONS_ID_TOKEN_REQUEST_TOKEN", "request-token")
+    monkeypatch.setattr(oidc, "_TOKEN_CACHE", {})
+    get = mock.Mock()
+    monkeypatch.setattr(oidc._SESSION, "get", get)
+    return get
+
+
+@pytest.mark.parametrize(
+    "request_url, expected_url",
+    [
+        (
+            "https://token.example.com/id",
+            "https://token.example.com/id?audience=https://grafos.ai",
+        ),
+        (
+            "https://token.example.com/id?x=1",
+            "https://token.example.com/id?x=1&audience=https://grafos.ai",
+        ),
+        (
+            "https://token.example.com/id?audience=custom",
+            "https://token.example.com/id?audience=custom",
+        ),
+    ],
+)
+def test_get_oidc_token_for_host_requests_token_for_audience(
+    mock_token_request: mock.Mock, monkeypatch, request_url: str, expected_url: str
+):
+    """Test that the audience is appended to the request URL and the token is returned"""
+    monkeypatch.setenv("ACTIONS_ID_TOKEN_REQUEST_URL", request_url)
+    mock_token_request.return_value.json.return_value = {"value": "oidc-token"}
+
+    token = oidc.get_oidc_token_for_host("https://grafos.ai")
+
+    assert token == "oidc-token"
+    assert mock_token_request.call_args[0][0] == expected_url
+    assert mock_token_request.call_args[1]["headers"] == {
+        "Authorization": "bearer request-token"
+    }
+
+
+@pytest.mark.parametrize(
+    "missing", ["ACTIONS_ID_TOKEN_REQUEST_URL", "ACTIONS_ID_TOKEN_REQUEST_TOKEN"]
+)
+def test_get_oidc_token_for_host_raises_if_env_missing(
+    mock_token_request: mock.Mock, monkeypatch, missing: str
+):
+    """Test that a ClickException is raised outside GitHub Actions"""
+    monkeypatch.delenv(missing)
+
+    with pytest.raises(click.ClickException, match="must be set in GitHub Actions"):
+        oidc.get_oidc_token_for_host("https://grafos.ai")
+
+    mock_token_request.assert_not_called()
+
+
+def _make_jwt(exp: float) -> str:
+    payload = (
+        base64.urlsafe_b64encode(json.dumps({"exp": exp}).encode())
+        .rstrip(b"=")
+        .decode()
+    )
+    return f"header.{payload}.sig"
+
+
+def test_get_oidc_token_for_host_reuses_token_until_near_expiry(
+    mock_token_request: mock.Mock,
+):
+    """Test that a token is only refetched once it is about to expire"""
+    fresh = _make_jwt(time.time() + 300)
+    expiring = _make_jwt(time.time() + 10)
+
+    mock_token_request.return_value.json.return_value = {"value": fresh}
+    assert oidc.get_oidc_token_for_host("https://grafos.ai") == fresh
+    assert oidc.get_oidc_token_for_host("https://grafos.ai") == fresh
+    assert mock_token_request.call_count == 1
+
+    # A different audience gets its own token
+    mock_token_request.return_value.json.return_value = {"value": expiring}
+    assert oidc.get_oidc_token_for_host("https://other.example.com") == expiring
+    assert mock_token_request.call_count == 2
+
+    # Too close to expiry to reuse
+    assert oidc.get_oidc_token_for_host("https://other.example.com") == expiring
+    assert mock_token_request.call_count == 3
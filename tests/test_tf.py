@@ -1,13 +1,14 @@
 import json
 import os
-import tarfile
-from datetime import datetime, timezone
+import time
+
 from pathlib import Path
+from types import SimpleNamespace
 from unittest import mock
 
 import pytest
 
-from infra_visualiser_action import client, tf
+from infra_visualiser_action import tf
 
 
 def _attempt(env_label: str, success: bool) -> tf.PlanAttempt:
@@ -19,41 +20,96 @@ def _attempt(env_label: str, success: bool) -> tf.PlanAttempt:
     )
 
 
-def test_run_plans_stops_on_first_success_and_restores_cwd(tmp_path: Path):
+def _plan_results_by_label(*attempts: tf.PlanAttempt):
+    """side_effect for tf_mocks.plan that answers by env_label, since attempts run concurrently."""
+    by_label = {a.env_label: a for a in attempts}
+    return lambda env_label, extra_args, **kwargs: by_label[env_label]
+
+
+@pytest.fixture
+def recipe_dir(tmp_path: Path) -> Path:
     recipe_dir = tmp_path / "recipe"
     recipe_dir.mkdir()
+    return recipe_dir
+
+
+@pytest.fixture
+def tfvars_files(tmp_path: Path) -> list[Path]:
+    return [tmp_path / "a.tfvars", tmp_path / "b.tfvars"]
+
+
+@pytest.fixture
+def tf_mocks(monkeypatch, recipe_dir: Path) -> SimpleNamespace:
+    """
+    Replaces the init/plan/graph steps of run_plans with Mocks. mocks.plan is
+    called as each attempt starts and returns the attempt it reports; the
+    started process stand-ins are collected in mocks.started.
+    """
+    mocks = SimpleNamespace(
+        init=mock.Mock(return_value=recipe_dir / "backend_override.tf"),
+        plan=mock.Mock(),
+        gen=mock.Mock(),
+        started=[],
+    )
 
-    tfvars_files = [tmp_path / "a.tfvars", tmp_path / "b.tfvars"]
+    def start_plan(*args, **kwargs):
+        proc = mock.Mock(spec_set=["wait", "kill"])
+        proc.wait.return_value = mocks.plan(*args, **kwargs)
+        mocks.started.append(proc)
+        return proc
+
+    monkeypatch.setattr(tf, "_run_init", mocks.init)
+    monkeypatch.setattr(tf, "_start_plan", start_plan)
+    monkeypatch.setattr(tf, "_generate_plan_and_graph", mocks.gen)
+    return mocks
+
+
+@pytest.fixture
+def fake_tofu(tmp_path: Path, monkeypatch) -> Path:
+    """
+    Puts a stand-in tofu on PATH: plans with slow.tfvars hang, plans with any
+    other var file fail, and plans with defaults succeed. Logs go to the
+    returned directory.
+    """
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    tofu = bin_dir / "tofu"
+    tofu.write_text(
+        "#!/bin/sh\n"
+        'case "$*" in\n'
+        "  *slow.tfvars*) exec sleep 30 ;;\n"
+        '  *-var-file*) echo "Error: missing variable"; exit 1 ;;\n'
+        "esac\n"
+        'echo "No changes."\n'
+    )
+    tofu.chmod(0o755)
+    monkeypatch.setenv("PATH", f"{bin_dir}{os.pathsep}{os.environ['PATH']}")
+
+    log_dir = tmp_path / "logs"
+    log_dir.mkdir()
+    monkeypatch.setattr(tf.tempfile, "tempdir", str(log_dir))
+    return log_dir
 
+
+def test_run_plans_stops_on_first_success_and_restores_cwd(
+    recipe_dir: Path, tfvars_files: list[Path], tf_mocks: SimpleNamespace
+):
     original_cwd = Path.cwd()
 
     override_file = recipe_dir / "backend_override.tf"
 
-    run_plan_results = [
+    tf_mocks.plan.side_effect = _plan_results_by_label(
         _attempt("defaults", False),
         _attempt("a.tfvars", True),
-        _attempt("b.tfvars", True),  # should never be used
-    ]
+        _attempt("b.tfvars", True),  # should never be reported
+    )
 
-    with (
-        mock.patch(
-            "infra_visualiser_action.tf._run_init",
-            side_effect=[override_file],
-        ) as mock_init,
-        mock.patch(
-            "infra_visualiser_action.tf._run_plan",
-            side_effect=run_plan_results,
-        ) as mock_run_plan,
-        mock.patch(
-            "infra_visualiser_action.tf._generate_plan_and_graph"
-        ) as mock_gen
-    ):
-        attempts, any_success = tf.run_plans(
-            recipe_dir=recipe_dir, tfvars_files=tfvars_files
-        )
+    attempts, any_success = tf.run_plans(
+        recipe_dir=recipe_dir, tfvars_files=tfvars_files
+    )
 
-    assert mock_init.call_count == 1
-    mock_init.assert_called_once_with(use_terraform=False)
+    assert tf_mocks.init.call_count == 1
+    tf_mocks.init.assert_called_once_with(recipe_dir, use_terraform=False)
     assert not override_file.exists()
 
     # First success should short-circuit
@@ -61,62 +117,127 @@ def test_run_plans_stops_on_first_success_and_restores_cwd(tmp_path: Path):
     assert [a.env_label for a in attempts] == ["defaults", "a.tfvars"]
     assert all(isinstance(a, tf.PlanAttempt) for a in attempts)
 
-    # _run_plan called for defaults then first tfvars only
-    assert mock_run_plan.call_count == 2
-    mock_run_plan.assert_any_call("defaults", [], use_terraform=False)
-    mock_run_plan.assert_any_call("a.tfvars", ["-var-file", str(tfvars_files[0])], use_terraform=False)
+    # Each attempt plans into its own file
+    tf_mocks.plan.assert_any_call(
+        "defaults",
+        [],
+        use_terraform=False,
+        plan_file="tfplan_0",
+        cwd=recipe_dir,
+        run_ts=mock.ANY,
+    )
+    tf_mocks.plan.assert_any_call(
+        "a.tfvars",
+        ["-var-file", str(tfvars_files[0])],
+        use_terraform=False,
+        plan_file="tfplan_1",
+        cwd=recipe_dir,
+        run_ts=mock.ANY,
+    )
 
     # Graph generation always called once
-    mock_gen.assert_called_once_with(recipe_dir=recipe_dir, use_terraform=False)
+    tf_mocks.gen.assert_called_once_with(recipe_dir=recipe_dir, use_terraform=False)
 
     # Always restore cwd
     assert Path.cwd() == original_cwd
 
 
-def test_run_plans_all_fail_returns_all_attempts_and_restores_cwd(tmp_path: Path):
-    recipe_dir = tmp_path / "recipe"
-    recipe_dir.mkdir()
-
-    tfvars_files = [tmp_path / "a.tfvars", tmp_path / "b.tfvars"]
-
+def test_run_plans_all_fail_returns_all_attempts_and_restores_cwd(
+    recipe_dir: Path, tfvars_files: list[Path], tf_mocks: SimpleNamespace
+):
     original_cwd = Path.cwd()
 
     override_file = recipe_dir / "backend_override.tf"
 
-    run_plan_results = [
+    tf_mocks.plan.side_effect = _plan_results_by_label(
         _attempt("defaults", False),
         _attempt("a.tfvars", False),
         _attempt("b.tfvars", False),
-    ]
+    )
 
-    with (
-        mock.patch(
-            "infra_visualiser_action.tf._run_init",
-            side_effect=[override_file],
-        ) as mock_init,
-        mock.patch(
-            "infra_visualiser_action.tf._run_plan",
-            side_effect=run_plan_results,
-        ) as mock_run_plan,
-        mock.patch(
-            "infra_visualiser_action.tf._generate_plan_and_graph"
-        ) as mock_gen
-    ):
-        attempts, any_success = tf.run_plans(
-            recipe_dir=recipe_dir, tfvars_files=tfvars_files
-        )
+    attempts, any_success = tf.run_plans(
+        recipe_dir=recipe_dir, tfvars_files=tfvars_files
+    )
 
-    assert mock_init.call_count == 1
+    assert tf_mocks.init.call_count == 1
     assert not override_file.exists()
 
     assert any_success is False
     assert [a.env_label for a in attempts] == ["defaults", "a.tfvars", "b.tfvars"]
 
-    assert mock_run_plan.call_count == 3
-    assert mock_gen.call_count == 0
+    assert tf_mocks.plan.call_count == 3
+    assert tf_mocks.gen.call_count == 0
     assert Path.cwd() == original_cwd
 
 
+def test_run_plans_keeps_plan_of_earliest_successful_attempt(
+    recipe_dir: Path, tfvars_files: list[Path], tf_mocks: SimpleNamespace
+):
+    results = {"defaults": False, "a.tfvars": True, "b.tfvars": True}
+
+    def fake_start_plan(env_label, extra_args, plan_file="tfplan", cwd=None, **kwargs):
+        (cwd / plan_file).write_text(env_label)
+        return _attempt(env_label, results[env_label])
+
+    tf_mocks.plan.side_effect = fake_start_plan
+
+    attempts, any_success = tf.run_plans(
+        recipe_dir=recipe_dir, tfvars_files=tfvars_files
+    )
+
+    assert any_success is True
+    assert [a.env_label for a in attempts] == ["defaults", "a.tfvars"]
+    assert (recipe_dir / "tfplan").read_text() == "a.tfvars"
+    assert not list(recipe_dir.glob("tfplan_*"))
+
+
+def test_run_plans_only_starts_a_bounded_window_of_attempts(
+    tmp_path: Path, recipe_dir: Path, tf_mocks: SimpleNamespace, monkeypatch
+):
+    tfvars_files = [tmp_path / f"{i}.tfvars" for i in range(5)]
+
+    monkeypatch.setattr(tf, "MAX_CONCURRENT_PLANS", 2)
+    monkeypatch.setattr(tf.os, "cpu_count", lambda: 8)
+    tf_mocks.plan.side_effect = (
+        lambda env_label, extra_args, **kwargs: _attempt(env_label, True)
+    )
+
+    attempts, any_success = tf.run_plans(
+        recipe_dir=recipe_dir, tfvars_files=tfvars_files
+    )
+
+    assert any_success is True
+    assert [a.env_label for a in attempts] == ["defaults"]
+    # Defaults succeeded, so only the first window was ever started, and the
+    # rest of it was stopped rather than waited for
+    assert tf_mocks.plan.call_count == 2
+    defaults, other = tf_mocks.started
+    defaults.kill.assert_not_called()
+    other.wait.assert_not_called()
+    other.kill.assert_called_once_with()
+
+
+def test_run_plans_stops_slower_attempts_once_defaults_succeeds(
+    tmp_path: Path, recipe_dir: Path, fake_tofu: Path, monkeypatch
+):
+    monkeypatch.setattr(tf, "_run_init", mock.Mock(return_value=None))
+    monkeypatch.setattr(tf, "_generate_plan_and_graph", mock.Mock())
+    monkeypatch.setattr(tf.os, "cpu_count", lambda: 8)
+    tfvars_files = [tmp_path / f"slow.tfvars.{i}" for i in range(3)]
+
+    started = time.monotonic()
+    attempts, any_success = tf.run_plans(
+        recipe_dir=recipe_dir, tfvars_files=tfvars_files
+    )
+
+    # The hanging attempts run for 30s unless they are stopped
+    assert time.monotonic() - started < 10
+    assert any_success is True
+    assert [a.env_label for a in attempts] == ["defaults"]
+    assert not list(recipe_dir.glob("tfplan_*"))
+    assert not list(fake_tofu.iterdir())
+
+
 def test_run_plans_raises_if_recipe_dir_missing(tmp_path: Path):
     missing = tmp_path / "does-not-exist"
 
@@ -126,262 +247,256 @@ def test_run_plans_raises_if_recipe_dir_missing(tmp_path: Path):
     assert "Recipe directory does not exist" in str(exc.value)
 
 
-def test_run_plans_uses_terraform_when_flag_is_set(tmp_path: Path):
+def test_run_plans_uses_terraform_when_flag_is_set(
+    recipe_dir: Path, tf_mocks: SimpleNamespace
+):
     """Test that run_plans uses terraform binary when use_terraform=True"""
-    recipe_dir = tmp_path / "recipe"
-    recipe_dir.mkdir()
-
     tfvars_files = []
 
     original_cwd = Path.cwd()
 
     override_file = recipe_dir / "backend_override.tf"
 
-    run_plan_results = [
+    tf_mocks.plan.side_effect = _plan_results_by_label(
         _attempt("defaults", True),
-    ]
+    )
 
-    with (
-        mock.patch(
-            "infra_visualiser_action.tf._run_init",
-            side_effect=[override_file],
-        ) as mock_init,
-        mock.patch(
-            "infra_visualiser_action.tf._run_plan",
-            side_effect=run_plan_results,
-        ) as mock_run_plan,
-        mock.patch(
-            "infra_visualiser_action.tf._generate_plan_and_graph"
-        ) as mock_gen
-    ):
-        attempts, any_success = tf.run_plans(
-            recipe_dir=recipe_dir, tfvars_files=tfvars_files, use_terraform=True
-        )
+    attempts, any_success = tf.run_plans(
+        recipe_dir=recipe_dir, tfvars_files=tfvars_files, use_terraform=True
+    )
 
-    assert mock_init.call_count == 1
-    mock_init.assert_called_once_with(use_terraform=True)
+    assert tf_mocks.init.call_count == 1
+    tf_mocks.init.assert_called_once_with(recipe_dir, use_terraform=True)
     assert not override_file.exists()
 
     assert any_success is True
     assert [a.env_label for a in attempts] == ["defaults"]
 
-    mock_run_plan.assert_called_once_with("defaults", [], use_terraform=True)
-    mock_gen.assert_called_once_with(recipe_dir=recipe_dir, use_terraform=True)
+    tf_mocks.plan.assert_called_once_with(
+        "defaults",
+        [],
+        use_terraform=True,
+        plan_file="tfplan_0",
+        cwd=recipe_dir,
+        run_ts=mock.ANY,
+    )
+    tf_mocks.gen.assert_called_once_with(recipe_dir=recipe_dir, use_terraform=True)
 
     assert Path.cwd() == original_cwd
 
 
-def test_find_local_modules_from_modules_json_returns_empty_if_file_not_exists(tmp_path: Path):
-    """Test that non-existent modules.json returns empty list"""
-    modules_json = tmp_path / "modules.json"
-    repo_root = tmp_path
-
-    result = tf.find_local_modules_from_modules_json(modules_json, repo_root)
-    assert result == []
-
+def test_plan_process_only_writes_log_for_failed_attempts(
+    recipe_dir: Path, fake_tofu: Path
+):
+    success = tf._start_plan("defaults", [], cwd=recipe_dir).wait()
+    failure = tf._start_plan(
+        "a.tfvars", ["-var-file", "a.tfvars"], cwd=recipe_dir
+    ).wait()
+
+    assert success.success is True
+    assert success.log_path is None
+
+    assert failure.success is False
+    assert failure.var_file == "a.tfvars"
+    assert failure.log_path.parent == fake_tofu
+    log = failure.log_path.read_text()
+    assert log.startswith("$ tofu plan -out=tfplan")
+    assert "Error: missing variable" in log
+    assert list(fake_tofu.iterdir()) == [failure.log_path]
+
+
+def test_generate_plan_and_graph_starts_all_commands_before_waiting(tmp_path: Path):
+    (tmp_path / "tfplan").touch()
+    events = []
+
+    def fake_popen(cmd, cwd, stdout):
+        assert cwd == tmp_path
+        events.append(("start", cmd[1]))
+        proc = mock.Mock()
+        proc.wait.side_effect = lambda: events.append(("wait", cmd[1]))
+        proc.poll.return_value = 0
+        return proc
+
+    with mock.patch("infra_visualiser_action.tf.subprocess.Popen", side_effect=fake_popen):
+        tf._generate_plan_and_graph(recipe_dir=tmp_path)
+
+    assert events == [
+        ("start", "show"),
+        ("start", "graph"),
+        ("start", "providers"),
+        ("wait", "show"),
+        ("wait", "graph"),
+        ("wait", "providers"),
+    ]
+    for name in ("tfplan.json", "terraform_graph.dot", "provider_schema.json"):
+        assert (tmp_path / name).exists()
 
-def test_find_local_modules_from_modules_json_returns_empty_if_no_modules(tmp_path: Path):
-    """Test that empty modules list returns empty list"""
-    modules_json = tmp_path / "modules.json"
-    modules_json.write_text(json.dumps({"Modules": []}), encoding="utf-8")
-    repo_root = tmp_path
 
-    result = tf.find_local_modules_from_modules_json(modules_json, repo_root)
-    assert result == set([modules_json])
+def test_generate_plan_and_graph_stops_started_commands_if_one_cannot_start(
+    tmp_path: Path,
+):
+    running = mock.Mock()
+    running.poll.return_value = None
 
+    with mock.patch(
+        "infra_visualiser_action.tf.subprocess.Popen",
+        side_effect=[running, FileNotFoundError("tofu")],
+    ):
+        with pytest.raises(FileNotFoundError):
+            tf._generate_plan_and_graph(recipe_dir=tmp_path)
+
+    running.terminate.assert_called_once_with()
+    running.wait.assert_called_once_with()
+
+
+def test_find_tfvars_files_skips_hidden_and_ignored_dirs(tmp_path: Path):
+    """Test that .tfvars files are found recursively, sorted, outside skipped dirs"""
+    (tmp_path / "envs" / "prod").mkdir(parents=True)
+    (tmp_path / "envs" / "prod" / "prod.tfvars").touch()
+    (tmp_path / "envs" / "dev.tfvars").touch()
+    (tmp_path / "root.tfvars").touch()
+    (tmp_path / "main.tf").touch()
+
+    for skipped in (".terraform", ".git", "venv", "__pycache__"):
+        (tmp_path / skipped).mkdir()
+        (tmp_path / skipped / "ignored.tfvars").touch()
+
+    result = tf.find_tfvars_files(tmp_path)
+    assert result == [
+        tmp_path / "envs" / "dev.tfvars",
+        tmp_path / "envs" / "prod" / "prod.tfvars",
+        tmp_path / "root.tfvars",
+    ]
 
-def test_find_local_modules_from_modules_json_prefers_dir_over_source(tmp_path: Path):
-    """Test that 'Dir' key is preferred over 'Source' key"""
-    # Create local module directories
-    local_module_dir = tmp_path / "modules" / "local-module"
-    local_module_dir.mkdir(parents=True)
-    (local_module_dir / "main.tf").touch()
 
-    source_module_dir = tmp_path / "modules" / "source-module"
-    source_module_dir.mkdir(parents=True)
-    (source_module_dir / "main.tf").touch()
+def test_find_tfvars_files_walks_each_repo_root_once(tmp_path: Path):
+    (tmp_path / "a.tfvars").touch()
+    first = tf.find_tfvars_files(tmp_path)
 
-    modules_json = tmp_path / "modules.json"
-    modules_json.write_text(
-        json.dumps({
-            "Modules": [
-                {
-                    "Dir": "modules/local-module",
-                    "Source": "modules/source-module",  # Should be ignored
-                }
-            ]
-        }),
-        encoding="utf-8",
-    )
-    repo_root = tmp_path
+    (tmp_path / "b.tfvars").touch()
+    assert tf.find_tfvars_files(tmp_path) == first == [tmp_path / "a.tfvars"]
 
-    result = tf.find_local_modules_from_modules_json(modules_json, repo_root)
-    assert len(result) == 2
-    assert result == set([modules_json.resolve(), local_module_dir.resolve()])
+    # Callers get their own list, not the cached one
+    first.clear()
+    assert tf.find_tfvars_files(tmp_path) == [tmp_path / "a.tfvars"]
 
+    tf._find_tfvars_cached.cache_clear()
+    assert tf.find_tfvars_files(tmp_path) == [tmp_path / "a.tfvars", tmp_path / "b.tfvars"]
 
-def test_find_local_modules_from_modules_json_uses_source_with_relative_paths(tmp_path: Path):
-    """Test that 'Source' with relative paths (./ or ../) is treated as local"""
-    local_module = tmp_path / "modules" / "my-module"
-    local_module.mkdir(parents=True)
-    (local_module / "main.tf").touch()
 
+def test_find_local_modules_from_modules_json_returns_empty_if_file_not_exists(tmp_path: Path):
+    """Test that non-existent modules.json returns empty list"""
     modules_json = tmp_path / "modules.json"
-    modules_json.write_text(
-        json.dumps({
-            "Modules": [
-                {"Source": "./modules/my-module"},
-            ]
-        }),
-        encoding="utf-8",
-    )
     repo_root = tmp_path
 
     result = tf.find_local_modules_from_modules_json(modules_json, repo_root)
-    assert len(result) == 2
-    assert result == set([modules_json.resolve(), local_module.resolve()])
+    assert result == []
 
 
-def test_find_local_modules_from_modules_json_ignores_remote_sources(tmp_path: Path):
-    """Test that remote sources (registry, git, etc.) are ignored"""
-    modules_json = tmp_path / "modules.json"
-    modules_json.write_text(
-        json.dumps({
-            "Modules": [
+@pytest.mark.parametrize(
+    "modules, module_dirs, expected",
+    [
+        pytest.param([], [], [], id="no-modules"),
+        pytest.param(
+            [
+                {
+                    "Dir": "modules/local-module",
+                    "Source": "modules/source-module",  # Should be ignored
+                }
+            ],
+            ["modules/local-module", "modules/source-module"],
+            ["modules/local-module"],
+            id="prefers-dir-over-source",
+        ),
+        pytest.param(
+            [{"Source": "./modules/my-module"}],
+            ["modules/my-module"],
+            ["modules/my-module"],
+            id="relative-source",
+        ),
+        pytest.param(
+            [
                 {"Source": "registry.terraform.io/hashicorp/aws"},
                 {"Source": "github.com/hashicorp/terraform-aws-modules"},
                 {"Source": "git::https://github.com/example/module.git"},
                 {"Source": "ssh://git@github.com/example/module.git"},
                 {"Source": "https://github.com/example/module.git"},
-            ]
-        }),
-        encoding="utf-8",
-    )
-    repo_root = tmp_path
-
-    result = tf.find_local_modules_from_modules_json(modules_json, repo_root)
-    assert result == set([modules_json.resolve()])
-
-
-def test_find_local_modules_from_modules_json_treats_non_remote_as_local(tmp_path: Path):
-    """Test that sources without remote prefixes are treated as local"""
-    local_module = tmp_path / "custom-module"
-    local_module.mkdir(parents=True)
-    (local_module / "main.tf").touch()
-
-    modules_json = tmp_path / "modules.json"
-    modules_json.write_text(
-        json.dumps({
-            "Modules": [
-                {"Source": "custom-module"},  # No ./ or remote prefix
-            ]
-        }),
-        encoding="utf-8",
-    )
-    repo_root = tmp_path
-
-    result = tf.find_local_modules_from_modules_json(modules_json, repo_root)
-    assert len(result) == 2
-    assert result == set([modules_json.resolve(), local_module.resolve()])
-
-
-def test_find_local_modules_from_modules_json_filters_nonexistent_paths(tmp_path: Path):
-    """Test that only existing paths are returned"""
-    existing_module = tmp_path / "existing"
-    existing_module.mkdir(parents=True)
-    (existing_module / "main.tf").touch()
-
-    modules_json = tmp_path / "modules.json"
-    modules_json.write_text(
-        json.dumps({
-            "Modules": [
+                {"Source": "registry.opentofu.org/hashicorp/aws"},
+                {"Source": "bitbucket.org/example/module"},
+                {"Source": "git@github.com:example/module.git"},
+                {"Source": "hg::http://example.com/module"},
+                {"Source": "s3::https://s3.amazonaws.com/bucket/module.zip"},
+                {"Source": "gcs::https://www.googleapis.com/storage/v1/bucket/module"},
+                {"Source": "http://example.com/module.zip"},
+            ],
+            [],
+            [],
+            id="ignores-remote-sources",
+        ),
+        pytest.param(
+            [{"Source": "custom-module"}],  # No ./ or remote prefix
+            ["custom-module"],
+            ["custom-module"],
+            id="non-remote-source-is-local",
+        ),
+        pytest.param(
+            [
                 {"Dir": "existing"},
                 {"Dir": "nonexistent"},  # Should be filtered out
-            ]
-        }),
-        encoding="utf-8",
-    )
-    repo_root = tmp_path
-
-    result = tf.find_local_modules_from_modules_json(modules_json, repo_root)
-    assert len(result) == 2
-    assert result == set([modules_json.resolve(), existing_module.resolve()])
-
-
-def test_find_local_modules_from_modules_json_deduplicates_paths(tmp_path: Path):
-    """Test that duplicate paths are deduplicated"""
-    local_module = tmp_path / "modules" / "my-module"
-    local_module.mkdir(parents=True)
-    (local_module / "main.tf").touch()
-
-    modules_json = tmp_path / "modules.json"
-    modules_json.write_text(
-        json.dumps({
-            "Modules": [
+            ],
+            ["existing"],
+            ["existing"],
+            id="filters-nonexistent-paths",
+        ),
+        pytest.param(
+            [
                 {"Dir": "modules/my-module"},
                 {"Source": "./modules/my-module"},  # Same module, different key
-            ]
-        }),
-        encoding="utf-8",
-    )
-    repo_root = tmp_path
-
-    result = tf.find_local_modules_from_modules_json(modules_json, repo_root)
-    assert len(result) == 2
-    assert result == set([modules_json.resolve(), local_module.resolve()])
-
-
-def test_find_local_modules_from_modules_json_supports_lowercase_keys(tmp_path: Path):
-    """Test that lowercase 'modules', 'source', 'dir' keys are supported"""
-    local_module = tmp_path / "modules" / "my-module"
-    local_module.mkdir(parents=True)
-    (local_module / "main.tf").touch()
-
-    modules_json = tmp_path / "modules.json"
-    modules_json.write_text(
-        json.dumps({
-            "modules": [  # lowercase
-                {
-                    "dir": "modules/my-module",  # lowercase
-                    "source": "./modules/my-module",  # lowercase
-                }
-            ]
-        }),
-        encoding="utf-8",
-    )
-    repo_root = tmp_path
-
-    result = tf.find_local_modules_from_modules_json(modules_json, repo_root)
-    assert len(result) == 2
-    assert result == set([modules_json.resolve(), local_module.resolve()])
-
-def test_find_local_modules_from_modules_json_handles_multiple_local_modules(tmp_path: Path):
-    """Test finding multiple local modules"""
-    module1 = tmp_path / "modules" / "module1"
-    module1.mkdir(parents=True)
-    (module1 / "main.tf").touch()
-
-    module2 = tmp_path / "modules" / "module2"
-    module2.mkdir(parents=True)
-    (module2 / "main.tf").touch()
-
-    modules_json = tmp_path / "modules.json"
-    modules_json.write_text(
-        json.dumps({
-            "Modules": [
+            ],
+            ["modules/my-module"],
+            ["modules/my-module"],
+            id="deduplicates-paths",
+        ),
+        pytest.param(
+            {
+                "modules": [  # lowercase
+                    {
+                        "dir": "modules/my-module",  # lowercase
+                        "source": "./modules/my-module",  # lowercase
+                    }
+                ]
+            },
+            ["modules/my-module"],
+            ["modules/my-module"],
+            id="lowercase-keys",
+        ),
+        pytest.param(
+            [
                 {"Dir": "modules/module1"},
                 {"Dir": "modules/module2"},
-            ]
-        }),
-        encoding="utf-8",
-    )
+            ],
+            ["modules/module1", "modules/module2"],
+            ["modules/module1", "modules/module2"],
+            id="multiple-local-modules",
+        ),
+    ],
+)
+def test_find_local_modules_from_modules_json(
+    tmp_path: Path, modules, module_dirs: list[str], expected: list[str]
+):
+    """Test which modules.json entries are returned as local module paths"""
+    for module_dir in module_dirs:
+        (tmp_path / module_dir).mkdir(parents=True)
+        (tmp_path / module_dir / "main.tf").touch()
+
+    modules_json = tmp_path / "modules.json"
+    data = modules if isinstance(modules, dict) else {"Modules": modules}
+    modules_json.write_text(json.dumps(data), encoding="utf-8")
     repo_root = tmp_path
 
     result = tf.find_local_modules_from_modules_json(modules_json, repo_root)
-    assert len(result) == 3
-    resolved_paths = {p.resolve() for p in result}
-    assert resolved_paths == {
+    assert len(result) == len(expected) + 1
+    assert {p.resolve() for p in result} == {
         modules_json.resolve(),
-        module1.resolve(),
-        module2.resolve()
+        *((tmp_path / e).resolve() for e in expected),
     }